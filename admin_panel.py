@@ -1,6 +1,7 @@
 import flet as ft
 import firebase_admin
 from firebase_admin import credentials, firestore
+from firebase_helpers import cartas_restantes, excluir_sala as excluir_sala_firestore
 
 # Inicializa Firebase Admin SDK
 cred = credentials.Certificate("serviceAccountKey.json")
@@ -43,10 +44,9 @@ def main(page: ft.Page):
             turno = data.get("turn", "-")
             vencedor = data.get("vencedor", None)
             status_sala = data.get("status", "-")
-            deck = data.get("deck", [])
 
             linha_info = [
-                ft.Text(f"🆔 Sala: {sala_id} | Status: {status_sala} | Turno: {turno} | Deck: {len(deck)} cartas", weight="bold")
+                ft.Text(f"🆔 Sala: {sala_id} | Status: {status_sala} | Turno: {turno} | Deck: {cartas_restantes(data)} cartas (deck_id {data.get('deck_id', '-')})", weight="bold")
             ]
 
             for label in ["player1", "player2"]:
@@ -88,7 +88,7 @@ def main(page: ft.Page):
         page.update()
 
     def excluir_sala(room_id):
-        db.collection(COLLECTION).document(room_id).delete()
+        excluir_sala_firestore(db.collection(COLLECTION).document(room_id))
         status.value = f"✅ Sala '{room_id}' excluída."
         listar_salas(None)
 
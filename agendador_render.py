@@ -0,0 +1,158 @@
+import asyncio
+import threading
+
+import flet as ft
+
+from sessao import da_sessao, recursos_da_sessao
+
+# Um quadro a cada ~33 ms: tudo o que for marcado nesse intervalo sai
+# num único page.update() (uma mensagem no websocket).
+INTERVALO_QUADRO = 1 / 30
+
+class AgendadorDeRender:
+    """
+    Agendador de render por sessão. Em vez de chamar control.update() ou
+    page.update() na hora, o código marca o que mudou e o agendador faz
+    um flush por quadro.
+
+    - marcar(*controles): só esses controles foram alterados
+    - marcar_pagina(): algo fora de um controle específico mudou
+      (visibilidade, listas de controles etc.) → page.update() completo
+
+    Pode ser chamado de qualquer thread (listeners do Firestore incluídos):
+    o flush roda no loop da página, como tarefa da sessão.
+    """
+
+    def __init__(self, page: ft.Page, recursos=None):
+        self.page = page
+        self._recursos = recursos
+        self._lock = threading.Lock()
+        self._controles = {}
+        self._pagina_suja = False
+        self._agendado = False
+
+    def marcar(self, *controles: ft.Control):
+        with self._lock:
+            for controle in controles:
+                if controle is not None:
+                    self._controles[id(controle)] = controle
+        self._agendar()
+
+    def marcar_pagina(self):
+        with self._lock:
+            self._pagina_suja = True
+        self._agendar()
+
+    def _agendar(self):
+        with self._lock:
+            if self._agendado:
+                return
+            self._agendado = True
+        try:
+            _rodar_no_loop(self.page, self._recursos, self._flush_no_proximo_quadro)
+        except Exception as e:
+            # print(f"⚠️ Agendador: não consegui agendar o flush: {e}")
+            with self._lock:
+                self._agendado = False
+
+    async def _flush_no_proximo_quadro(self):
+        try:
+            await asyncio.sleep(INTERVALO_QUADRO)
+        except asyncio.CancelledError:
+            # sessão encerrada: se o cliente reconectar, o próximo marcar agenda de novo
+            with self._lock:
+                self._agendado = False
+            raise
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            controles = list(self._controles.values())
+            pagina_suja = self._pagina_suja
+            self._controles.clear()
+            self._pagina_suja = False
+            self._agendado = False
+
+        try:
+            if pagina_suja:
+                self.page.update()
+            elif controles:
+                # só os que ainda estão na página; todos na mesma mensagem
+                montados = [c for c in controles if c.page is not None]
+                if montados:
+                    self.page.update(*montados)
+        except Exception as e:
+            pass
+            # print(f"⚠️ Agendador: erro no flush: {e}")
+
+
+def agendador_da_pagina(page: ft.Page) -> AgendadorDeRender:
+    """Agendador da sessão (um por page, guardado em page.session)."""
+    return da_sessao(page, "agendador_render",
+                     lambda page: AgendadorDeRender(page, recursos_da_sessao(page)))
+
+
+def _rodar_no_loop(page, recursos, handler):
+    """Tarefa da sessão quando há recursos (cancelada com ela); senão page.run_task."""
+    if recursos is not None:
+        return recursos.tarefa(handler)
+    return page.run_task(handler)
+
+
+class CaixaDeSnapshots:
+    """
+    Caixa de entrada de snapshots de um documento: fila de tamanho 1 que
+    guarda só o mais novo (por update_time), descarta os atrasados/duplicados
+    e entrega no máximo um por quadro a processar(doc).
+
+    receber() é chamado na thread do listener do Firestore e só enfileira;
+    processar(doc) roda no loop da página (tarefa da sessão), um de cada vez,
+    então não disputa os controles com os handlers do Flet e não segura a
+    thread de watch (que atende os listeners das outras salas).
+    """
+
+    def __init__(self, page: ft.Page, processar, recursos=None):
+        self._page = page
+        self._processar = processar
+        self._recursos = recursos
+        self._lock = threading.Lock()
+        self._pendente = None
+        self._ultimo_update_time = None
+        self._agendado = False
+
+    def receber(self, doc):
+        with self._lock:
+            referencia = self._pendente.update_time if self._pendente else self._ultimo_update_time
+            if referencia is not None and doc.update_time is not None and doc.update_time <= referencia:
+                return  # atrasado ou repetido
+            self._pendente = doc
+            if self._agendado:
+                return
+            self._agendado = True
+        try:
+            _rodar_no_loop(self._page, self._recursos, self._drenar)
+        except Exception as e:
+            print(f"⚠️ Não consegui agendar o snapshot: {e}")
+            with self._lock:
+                self._agendado = False
+
+    async def _drenar(self):
+        while True:
+            try:
+                await asyncio.sleep(INTERVALO_QUADRO)
+            except asyncio.CancelledError:
+                with self._lock:
+                    self._agendado = False
+                raise
+            with self._lock:
+                doc = self._pendente
+                self._pendente = None
+                if doc is None:
+                    self._agendado = False
+                    return
+                self._ultimo_update_time = doc.update_time or self._ultimo_update_time
+
+            try:
+                self._processar(doc)
+            except Exception as e:
+                print(f"⚠️ Erro ao processar snapshot: {e}")
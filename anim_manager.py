@@ -1,6 +1,9 @@
 import flet as ft
 import asyncio
 
+from agendador_render import agendador_da_pagina
+from sessao import recursos_da_sessao
+
 class AnimationManager:
     def __init__(self):
         self._animations = []
@@ -41,7 +44,7 @@ class AnimationManager:
                     control.color = target_color
                 if target_opacity is not None:
                     control.opacity = target_opacity
-                control.update()
+                self._marcar(control)
 
                 await asyncio.sleep(duration / 1000)
 
@@ -53,7 +56,7 @@ class AnimationManager:
                         control.color = initial_color
                     if target_opacity is not None:
                         control.opacity = initial_opacity
-                    control.update()
+                    self._marcar(control)
 
                     await asyncio.sleep(duration / 1000)
 
@@ -67,7 +70,13 @@ class AnimationManager:
                 control.color = initial_color
             if target_opacity is not None:
                 control.opacity = initial_opacity
-            control.update()
+            self._marcar(control)
+
+    @staticmethod
+    def _marcar(control: ft.Control):
+        """Queues the control for the page's next render frame (see agendador_render)."""
+        if control.page is not None:
+            agendador_da_pagina(control.page).marcar(control)
 
     def start_animation(self, page: ft.Page):
         """
@@ -89,10 +98,11 @@ class AnimationManager:
 
                 await self._animate_control_task(ctrl, **kw)
 
-            task = page.run_task(wrapper)
+            # registered with the session so a closed tab cancels it too
+            task = recursos_da_sessao(page).tarefa(wrapper)
             self._running_tasks.append(task)
 
-        page.update()
+        agendador_da_pagina(page).marcar_pagina()
 
     def stop_animation(self):
         """
@@ -0,0 +1,92 @@
+import threading
+
+import flet as ft
+
+from sessao import da_sessao, recursos_da_sessao
+
+
+class ArmazenamentoLocal:
+    """
+    Camada write-through sobre page.client_storage, uma por sessão.
+
+    Cada get/set/contains_key do client_storage é uma ida e volta ao
+    navegador. Aqui cada chave é lida do navegador uma única vez; depois
+    as leituras saem da memória. As escritas atualizam a memória na hora
+    e só os valores que mudaram são enviados, todos juntos, numa thread
+    (page.run_thread), sem segurar quem chamou. Enquanto grava, a thread
+    fica nos recursos da sessão; se a sessão acabar, o que falta é descartado.
+    """
+
+    def __init__(self, page: ft.Page, recursos=None):
+        self.page = page
+        self._recursos = recursos
+        self._lock = threading.Lock()
+        self._valores = {}
+        self._sujos = {}
+        self._gravando = False
+
+    def get(self, chave, padrao=None):
+        with self._lock:
+            if chave in self._valores:
+                valor = self._valores[chave]
+                return padrao if valor is None else valor
+
+        valor = self.page.client_storage.get(chave)  # None se não existir
+
+        with self._lock:
+            # uma escrita feita enquanto líamos vale mais que o valor lido
+            valor = self._valores.setdefault(chave, valor)
+        return padrao if valor is None else valor
+
+    def contains_key(self, chave):
+        return self.get(chave) is not None
+
+    def set(self, chave, valor):
+        with self._lock:
+            if chave in self._valores and self._valores[chave] == valor:
+                return
+            self._valores[chave] = valor
+            self._sujos[chave] = valor
+            if self._gravando:
+                return
+            self._gravando = True
+            if self._recursos is not None:
+                self._recursos.registrar("gravacao", self, self._descartar)
+        try:
+            self.page.run_thread(self._gravar)
+        except Exception as e:
+            print(f"⚠️ Armazenamento local: não consegui agendar a gravação: {e}")
+            with self._lock:
+                self._terminar_gravacao()
+
+    def _descartar(self):
+        """Fim da sessão: o navegador já foi, não adianta gravar o resto."""
+        with self._lock:
+            self._sujos = {}
+
+    def _terminar_gravacao(self):
+        # chamado com o lock: um set() logo depois registra a próxima gravação
+        self._gravando = False
+        if self._recursos is not None:
+            self._recursos.liberar(self)
+
+    def _gravar(self):
+        while True:
+            with self._lock:
+                sujos = self._sujos
+                self._sujos = {}
+                if not sujos:
+                    self._terminar_gravacao()
+                    return
+
+            for chave, valor in sujos.items():
+                try:
+                    self.page.client_storage.set(chave, valor)
+                except Exception as e:
+                    print(f"⚠️ Armazenamento local: erro ao gravar '{chave}': {e}")
+
+
+def armazenamento_da_pagina(page: ft.Page) -> ArmazenamentoLocal:
+    """Armazenamento local da sessão (um por page, guardado em page.session)."""
+    return da_sessao(page, "armazenamento_local",
+                     lambda page: ArmazenamentoLocal(page, recursos_da_sessao(page)))
@@ -0,0 +1,253 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import flet as ft
+from google.api_core.exceptions import FailedPrecondition
+
+from deck import decodificar_mao
+from firebase_helpers import (
+    TENTATIVAS_ESCRITA, CARTA_FORA_DA_MAO, invalidar_cache, ler_documento_versionado,
+    ref_mao, planejar_jogada, gravar_jogada_se, finalizar_se_acabou,
+)
+from registro_escutas import central_de_escutas
+
+# Segundos sem comandos até o ator de uma sala encerrar (fila + escuta)
+OCIOSO = 120
+
+# Segundos que um handler do Flet aguarda o resultado de uma jogada
+TEMPO_RESPOSTA = 15
+
+
+# ---------------------------------------------------
+# 🎭 Ator da sala
+# ---------------------------------------------------
+# Uma tarefa asyncio com uma fila por sala ativa neste processo. As
+# jogadas das duas sessões (jogar, descartar, aceitar a extensão) entram
+# na fila e são aplicadas uma de cada vez sobre a sala e as mãos em
+# memória, que as escutas compartilhadas e as próprias escritas do ator
+# mantêm em dia. Cada jogada vira um único batch condicionado ao
+# update_time da sala e da mão que o ator conhece: sem transação e sem ler
+# antes de gravar. Se alguém de fora do ator gravou no meio (outro
+# processo, placar, nova distribuição), o batch falha, o ator relê e
+# avalia a jogada de novo.
+class AtorDaSala:
+    def __init__(self, sala_ref, loop):
+        self.sala_ref = sala_ref
+        self._loop = loop
+        self._fila = asyncio.Queue()
+        self._lock = threading.Lock()
+        self._docs = {}  # path → (dados, update_time): a sala e as duas mãos
+        self._pendentes = 0  # protegido pelo lock da central
+        self._assinaturas = []
+
+    def _iniciar(self):
+        asyncio.run_coroutine_threadsafe(self._rodar(), self._loop)
+        refs = [self.sala_ref, ref_mao(self.sala_ref, "player1"), ref_mao(self.sala_ref, "player2")]
+        for ref in refs:
+            try:
+                self._assinaturas.append(central_de_escutas.assinar(ref, self._ao_receber))
+            except Exception as e:
+                print(f"⚠️ Ator da sala {self.sala_ref.id}: sem escuta de {ref.id}, lendo a cada conflito: {e}")
+
+    def _enfileirar(self, acao, caminho, carta):
+        futuro = Future()
+        self._loop.call_soon_threadsafe(self._fila.put_nowait, (acao, caminho, carta, futuro))
+        return futuro
+
+    async def _rodar(self):
+        futuro = None
+        try:
+            while True:
+                try:
+                    acao, caminho, carta, futuro = await asyncio.wait_for(self._fila.get(), OCIOSO)
+                except asyncio.TimeoutError:
+                    if central_de_atores._sair_se_ocioso(self):
+                        return
+                    continue
+
+                try:
+                    resultado = await asyncio.to_thread(self._aplicar, acao, caminho, carta)
+                except Exception as e:
+                    print(f"❌ Ator da sala {self.sala_ref.id}: erro em '{acao}' de {caminho}: {e}")
+                    resultado = "erro ao acessar a sala"
+                finally:
+                    central_de_atores._concluido(self)
+                if not futuro.done():  # quem esperava pode ter desistido (cancelado)
+                    futuro.set_result(resultado)
+        finally:
+            # Ocioso, cancelado ou com erro: sai da central (a próxima jogada
+            # cria outro ator) e responde a jogada em andamento e quem ainda
+            # estava na fila
+            central_de_atores._retirar(self)
+            pendentes = [futuro] if futuro is not None else []
+            while not self._fila.empty():
+                *_, futuro = self._fila.get_nowait()
+                pendentes.append(futuro)
+            for futuro in pendentes:
+                if not futuro.done():
+                    futuro.set_result("o servidor da sala foi reiniciado, tente de novo")
+            # fechar a última inscrição de uma escuta junta a thread do watch
+            # (até ~1 s por documento): no executor, fora do loop, que é de
+            # todas as sessões (sem await: vale também para a tarefa cancelada)
+            try:
+                asyncio.get_running_loop().run_in_executor(None, self._encerrar)
+            except RuntimeError:
+                self._encerrar()  # loop já fechado
+
+    def _aplicar(self, acao, caminho, carta):
+        """Roda no executor, uma jogada por vez. Retorna o resultado da jogada."""
+        refs = [self.sala_ref]
+        if acao != "extensao":
+            refs.append(ref_mao(self.sala_ref, caminho))
+        mao_conferida = False
+
+        for _ in range(TENTATIVAS_ESCRITA):
+            docs = {ref.path: self._ler(ref) for ref in refs}
+            sala = docs[self.sala_ref.path][0]
+            mao = decodificar_mao(docs[refs[-1].path][0].get("hand")) if len(refs) > 1 else []
+
+            resultado, updates = planejar_jogada(self.sala_ref, sala, mao, acao, caminho, carta)
+            if resultado == CARTA_FORA_DA_MAO and not mao_conferida:
+                # a mão em memória pode ser de antes de uma nova distribuição
+                mao_conferida = True
+                self._esquecer(refs[-1].path)
+                continue
+            if not updates:
+                return resultado
+
+            try:
+                gravados = gravar_jogada_se(self.sala_ref, docs, updates)
+            except FailedPrecondition:
+                # print(f"🔁 Ator da sala {self.sala_ref.id}: sala ou mão mudou por fora — relendo.")
+                for ref in refs:
+                    invalidar_cache(ref)
+                self._esquecer(*docs)
+                continue
+
+            for path, (dados, update_time) in gravados.items():
+                self._guardar(path, dados, update_time)
+            if finalizar_se_acabou(self.sala_ref, gravados[self.sala_ref.path][0]):
+                self._esquecer(self.sala_ref.path)  # o placar gravou por fora do ator
+            return resultado
+
+        print(f"⚠️ Ator da sala {self.sala_ref.id}: {TENTATIVAS_ESCRITA} conflitos seguidos em '{acao}'.")
+        return "a sala mudou durante a jogada, tente de novo"
+
+    def _ler(self, ref):
+        """(dados, update_time) em memória; senão do cache em dia ou da rede."""
+        with self._lock:
+            doc = self._docs.get(ref.path)
+        if doc is None:
+            doc = ler_documento_versionado(ref)
+            self._guardar(ref.path, *doc)
+        return doc
+
+    def _ao_receber(self, docs, changes, read_time):
+        # snapshots compartilhados (SnapshotDecodificado): só leitura
+        for doc in docs:
+            if doc.exists:
+                self._guardar(doc.reference.path, doc.to_dict(), doc.update_time)
+
+    def _guardar(self, path, dados, update_time):
+        with self._lock:
+            atual = self._docs.get(path)
+            if atual is None or atual[1] is None or (update_time and update_time >= atual[1]):
+                self._docs[path] = (dados, update_time)
+
+    def _esquecer(self, *paths):
+        """A próxima jogada relê esses documentos (ou usa o próximo snapshot)."""
+        with self._lock:
+            for path in paths:
+                self._docs.pop(path, None)
+
+    def _encerrar(self):
+        with self._lock:
+            assinaturas, self._assinaturas = self._assinaturas, []
+        for assinatura in assinaturas:
+            try:
+                assinatura.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ Erro ao fechar uma escuta do ator da sala {self.sala_ref.id}: {e}")
+
+
+class CentralDeAtores:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._atores = {}
+
+    def enviar(self, page: ft.Page, sala_ref, acao, caminho, carta=None) -> Future:
+        """
+        Põe a jogada na fila do ator da sala (criado no loop da página se
+        ainda não existe). Devolve um Future com o resultado de
+        planejar_jogada: True, "EXTENSAO_PENDENTE" ou o motivo da recusa.
+        """
+        with self._lock:
+            ator = self._atores.get(sala_ref.path)
+            novo = ator is None
+            if novo:
+                ator = self._atores[sala_ref.path] = AtorDaSala(sala_ref, page.loop)
+            ator._pendentes += 1
+        try:
+            if novo:
+                ator._iniciar()
+            return ator._enfileirar(acao, caminho, carta)
+        except Exception:
+            # loop da página já fechado: não deixa o ator preso na central
+            # (aqui é a thread do handler, pode fechar as escutas direto)
+            self._concluido(ator)
+            self._retirar(ator)
+            ator._encerrar()
+            raise
+
+    def _concluido(self, ator):
+        with self._lock:
+            ator._pendentes -= 1
+
+    def _sair_se_ocioso(self, ator) -> bool:
+        """Tira o ator da central se ninguém mandou comando; quem fecha as escutas é o _rodar."""
+        with self._lock:
+            if ator._pendentes:
+                return False  # chegou comando enquanto o tempo esgotava
+            self._retirar_com_lock(ator)
+        return True
+
+    def _retirar(self, ator):
+        with self._lock:
+            self._retirar_com_lock(ator)
+
+    def _retirar_com_lock(self, ator):
+        if self._atores.get(ator.sala_ref.path) is ator:
+            del self._atores[ator.sala_ref.path]
+
+    def atores_ativos(self) -> int:
+        with self._lock:
+            return len(self._atores)
+
+
+central_de_atores = CentralDeAtores()
+
+
+def enviar_jogada(page: ft.Page, sala_ref, acao, caminho, carta=None) -> Future:
+    """Jogada para o ator da sala: "jogada", "descarte" ou "extensao"."""
+    return central_de_atores.enviar(page, sala_ref, acao, caminho, carta)
+
+
+async def jogar_na_sala(page: ft.Page, sala_ref, acao, caminho, carta=None, timeout=TEMPO_RESPOSTA):
+    """
+    enviar_jogada() aguardando o resultado, para os handlers async do Flet:
+    nenhuma thread fica presa esperando o ator. Retorna None se o ator não
+    respondeu a tempo.
+    """
+    try:
+        # criar o ator abre as escutas da sala: fora do loop
+        futuro = await asyncio.to_thread(enviar_jogada, page, sala_ref, acao, caminho, carta)
+        return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout)
+    except Exception as e:
+        print(f"⚠️ Ator da sala {sala_ref.id}: sem resposta para '{acao}' de {caminho}: {e!r}")
+        return None
+
+
+def atores_ativos() -> int:
+    """Quantas salas têm um ator rodando neste processo."""
+    return central_de_atores.atores_ativos()
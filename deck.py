@@ -1,4 +1,5 @@
-from random import shuffle
+from functools import lru_cache
+from random import Random, getrandbits, shuffle
 
 # Quantidade oficial de cartas no Mille Bornes
 CARD_DEFINITIONS = {
@@ -31,12 +32,76 @@ CARD_DEFINITIONS = {
     }
 }
 
-def create_deck():
-    """Cria um baralho embaralhado com a composição oficial do Mille Bornes."""
+TAMANHO_BARALHO = sum(sum(cartas.values()) for cartas in CARD_DEFINITIONS.values())
+
+# Ids compactos (0..18) usados para gravar as cartas no Firestore:
+# a posição de cada (tipo, valor) na ordem de CARD_DEFINITIONS.
+CARTAS = [(tipo, valor) for tipo, cartas in CARD_DEFINITIONS.items() for valor in cartas]
+ID_CARTA = {carta: i for i, carta in enumerate(CARTAS)}
+KM_CARTA = {valor: int(valor.split()[0]) for valor in CARD_DEFINITIONS["distancia"]}
+
+
+def codificar_carta(carta):
+    """{"type", "value"} → id inteiro."""
+    return ID_CARTA[(carta["type"], carta["value"])]
+
+
+def decodificar_carta(carta_id):
+    """id inteiro → {"type", "value"} (aceita também o formato antigo em dict)."""
+    if isinstance(carta_id, dict):
+        return dict(carta_id)
+    tipo, valor = CARTAS[carta_id]
+    return {"type": tipo, "value": valor}
+
+
+def contar_mao(mao):
+    """Mão → {"id": quantidade} (no Firestore as chaves de mapa são strings)."""
+    contagem = {}
+    for carta in mao:
+        chave = str(codificar_carta(carta))
+        contagem[chave] = contagem.get(chave, 0) + 1
+    return contagem
+
+
+def decodificar_mao(mao):
+    """
+    Mapa {"id": quantidade} → lista de cartas, ordenada por id.
+    Aceita também a lista de ids (ou de dicts) dos formatos antigos.
+    """
+    if isinstance(mao, dict):
+        ids = sorted(int(chave) for chave, quantidade in mao.items() for _ in range(quantidade))
+    else:
+        ids = mao or []
+    return [decodificar_carta(carta_id) for carta_id in ids]
+
+
+def create_deck(seed=None):
+    """
+    Cria um baralho embaralhado com a composição oficial do Mille Bornes.
+    Com a mesma seed a ordem é sempre a mesma (permite reproduzir a mão).
+    """
     deck = []
     for tipo, cartas in CARD_DEFINITIONS.items():
         for valor, quantidade in cartas.items():
             deck.extend([{"type": tipo, "value": valor} for _ in range(quantidade)])
-    shuffle(deck)
+    if seed is None:
+        shuffle(deck)
+    else:
+        Random(seed).shuffle(deck)
     # print(f'deck: {deck}')
     return deck
+
+
+def nova_seed():
+    """Seed aleatória para embaralhar uma nova mão."""
+    return getrandbits(32)
+
+
+@lru_cache(maxsize=64)
+def _baralho_da_seed(seed):
+    return tuple(create_deck(seed))
+
+
+def cartas_do_baralho(seed, inicio, quantidade):
+    """Cartas [inicio, inicio + quantidade) do baralho gerado pela seed."""
+    return [dict(carta) for carta in _baralho_da_seed(seed)[inicio:inicio + quantidade]]
@@ -1,11 +1,27 @@
-import random
+import copy
+import threading
 import time
+from collections import OrderedDict
+from datetime import timedelta
 from uuid import uuid4  # Adicionado para uso potencial em shuffle (se necessário)
 
+from firebase_admin import firestore
+from google.api_core.exceptions import FailedPrecondition
+
+from armazenamento_local import armazenamento_da_pagina
+
+import regras
+from deck import (
+    TAMANHO_BARALHO, KM_CARTA, cartas_do_baralho, nova_seed,
+    codificar_carta, contar_mao
+)
+
+TAMANHO_MAO = 7
+
 
 def obter_nome_jogador(page):
     try:
-        return page.client_storage.get("nome_jogador")
+        return armazenamento_da_pagina(page).get("nome_jogador")
     except Exception as e:
         # print(f"⚠️ Erro ao obter nome do jogador: {e}")
         return
@@ -13,362 +29,554 @@ def obter_nome_jogador(page):
 
 def obter_sala_jogador(page):
     try:
-        return page.client_storage.get("sala_jogador")
+        return armazenamento_da_pagina(page).get("sala_jogador")
     except Exception as e:
         # print(f"⚠️ Erro ao obter sala do jogador: {e}")
         return
 
 
-def corrigir_mao_jogador(sala_ref, estado_jogo):
-    try:
-        snapshot_atual = sala_ref.get()
-        sala_data = snapshot_atual.to_dict()
-    except Exception as e:
-        # print(f"❌ Erro ao acessar Firestore em corrigir_mao_jogador: {e}")
-        return
+# ---------------------------------------------------
+# 🗃️ Cache dos documentos das salas
+# ---------------------------------------------------
+# Alimentado pelas escutas da central (registro_escutas): cada entrada
+# guarda o último documento recebido e o seu update_time. Só há entrada
+# enquanto a escuta daquele documento está aberta — sem listener ninguém
+# avisaria das escritas dos outros, então as leituras vão para a rede.
+# Depois de uma escrita nossa a entrada fica "velha" até chegar o snapshot
+# com aquele update_time (ou um mais novo); até lá também vão para a rede.
+_cache_docs = {}
+_escutas_vivas = set()
+_cache_lock = threading.Lock()
 
-    if not sala_data:
-        return
 
-    caminho = estado_jogo["meu_caminho"]
-    jogador_data = sala_data.get(caminho)
+def escuta_aberta(ref):
+    """A central abriu o listener do documento: o cache passa a valer."""
+    with _cache_lock:
+        _escutas_vivas.add(ref.path)
+        _cache_docs.pop(ref.path, None)  # espera o primeiro snapshot
+
 
-    if not jogador_data:
+def escuta_fechada(ref):
+    """O listener fechou: o cache do documento deixa de ser confiável."""
+    with _cache_lock:
+        _escutas_vivas.discard(ref.path)
+        _cache_docs.pop(ref.path, None)
+
+
+def registrar_snapshot(doc):
+    """Guarda no cache o documento recebido pelo listener (ou por um get)."""
+    if not doc.exists:
         return
+    with _cache_lock:
+        if doc.reference.path not in _escutas_vivas:
+            return  # ninguém manteria a entrada em dia
+        entrada = _cache_docs.get(doc.reference.path)
+        if entrada and entrada["update_time"] and doc.update_time < entrada["update_time"]:
+            return  # snapshot atrasado
+        pendente = entrada["pendente"] if entrada else None
+        if pendente and doc.update_time >= pendente:
+            pendente = None
+        _cache_docs[doc.reference.path] = {
+            "data": doc.to_dict() or {},
+            "update_time": doc.update_time,
+            "pendente": pendente,
+        }
 
-    mao_atual = jogador_data.get("hand", [])
-    deck = sala_data.get("deck", [])
-
-    cartas_faltando = 7 - len(mao_atual)
-    if cartas_faltando <= 0 or not deck:
-        # ⚠️ Verifica fim de jogo se não há cartas no deck nem nas mãos
-        mao1 = len(sala_data.get("player1", {}).get("hand", []))
-        mao2 = len(sala_data.get("player2", {}).get("hand", []))
-        if not deck and mao1 == 0 and mao2 == 0 and not sala_data.get("game_status") == "finished":
-            # 🏁 Acionando Fim de Jogo por Baralho Vazio
-            finalizar_placar_mao(sala_ref, sala_data, mao_vazia=True)
+
+def invalidar_cache(ref, update_time=None):
+    """
+    Marca a entrada como velha depois de uma escrita. Sem update_time
+    (ex.: commit de transação), exige qualquer snapshot mais novo.
+    """
+    with _cache_lock:
+        entrada = _cache_docs.get(ref.path)
+        if not entrada:
             return
+        if update_time is None:
+            update_time = entrada["update_time"] + timedelta(microseconds=1)
+        elif entrada["update_time"] >= update_time:
+            return  # o eco da escrita já chegou
+        entrada["pendente"] = max(update_time, entrada["pendente"] or update_time)
+
+
+def ler_documento_versionado(ref, campos=None):
+    """(dados, update_time): do cache quando está em dia, senão da rede."""
+    with _cache_lock:
+        # só há entrada com a escuta aberta (escuta_aberta/escuta_fechada)
+        entrada = _cache_docs.get(ref.path)
+        if entrada and not entrada["pendente"]:
+            return copy.deepcopy(entrada["data"]), entrada["update_time"]
+    snapshot = ref.get(field_paths=campos)
+    if campos is None:
+        registrar_snapshot(snapshot)
+    return snapshot.to_dict() or {}, snapshot.update_time
+
+
+def ler_documento(ref, campos=None):
+    """
+    Lê do cache do listener; vai à rede quando o cache está velho ou o
+    documento não tem escuta aberta.
+    Com campos, a leitura de rede traz só esses caminhos (e não entra no cache).
+    """
+    return ler_documento_versionado(ref, campos)[0]
 
-    if cartas_faltando > 0 and deck:
-        # Puxa cartas do deck para completar a mão
-        for _ in range(cartas_faltando):
-            if deck:
-                carta_puxada = deck.pop(0)
-                mao_atual.append(carta_puxada)
-            else:
-                break
-
-        updates = {
-            f"{caminho}.hand": mao_atual,
-            "deck": deck
-        }
-        sala_ref.update(updates)
 
+# ---------------------------------------------------
+# 🎯 Campos lidos por operação (leituras com máscara)
+# ---------------------------------------------------
+# Quando a leitura precisa ir à rede, cada operação pede só o que usa.
+def _oponente(caminho):
+    return "player2" if caminho == "player1" else "player1"
 
-def distribuir_cartas(sala_ref, deck):
-    random.shuffle(deck)
-    updates = {
-        "deck": deck[14:],
-        "player1.hand": deck[:7],
-        "player2.hand": deck[7:14],
-        "turn": "player1",
-        "game_status": "started",
-        "baralho": True
-    }
-    sala_ref.update(updates)
 
+CAMPOS_JOGADOR_PLACAR = (
+    "distance", "extensao", "safeties", "safety_responses", "com_200", "placar", "placar_registrado",
+)
+
+CAMPOS_PLACAR = [
+    f"{caminho}.{campo}" for caminho in ("player1", "player2") for campo in CAMPOS_JOGADOR_PLACAR
+] + ["deck_count"]
+
+CAMPOS_FIM_DE_BARALHO = [
+    "player1.distance", "player1.hand_count",
+    "player2.distance", "player2.hand_count",
+    "deck_count",
+]
 
-def jogar_carta(sala_ref, estado_jogo, carta):
+
+def atualizar_documento(ref, updates):
+    """ref.update() que já marca o cache como velho até o eco da escrita."""
+    resultado = ref.update(updates)
+    invalidar_cache(ref, resultado.update_time)
+    return resultado
+
+
+# ---------------------------------------------------
+# 🔢 Escritas condicionais
+# ---------------------------------------------------
+# As escritas que os dois clientes disparam a partir do on_snapshot
+# (auto-registro, failsafe de turno, nova distribuição, placar) usam
+# atualizar_se(): só valem se o documento não mudou desde a leitura
+# (precondição de update_time). Em conflito, relê e decide de novo — e
+# não escreve nada se a decisão já não for necessária (o outro cliente
+# fez primeiro).
+TENTATIVAS_ESCRITA = 3
+
+
+def _precondicao(update_time):
+    if update_time is None:
+        return None
+    return firestore.client().write_option(last_update_time=update_time)
+
+
+def atualizar_se(ref, decidir, campos=None):
+    """
+    decidir(dados) devolve os updates, ou None quando não há nada a gravar.
+    Retorna o resultado da escrita, ou None se nada foi gravado.
+    """
+    for _ in range(TENTATIVAS_ESCRITA):
+        dados, update_time = ler_documento_versionado(ref, campos)
+        updates = decidir(dados)
+        if not updates:
+            return None
+        try:
+            resultado = ref.update(updates, option=_precondicao(update_time))
+        except FailedPrecondition:
+            # print(f"🔁 Conflito de escrita em {ref.path} — relendo.")
+            invalidar_cache(ref)
+            continue
+        invalidar_cache(ref, resultado.update_time)
+        return resultado
+    print(f"⚠️ atualizar_se: {TENTATIVAS_ESCRITA} conflitos seguidos em {ref.path}, desistindo.")
+    return None
+
+
+# ---------------------------------------------------
+# ✋ Mãos privadas (salas/{id}/hands/{player})
+# ---------------------------------------------------
+# Cada jogador escuta só o documento da própria mão; a sala guarda apenas
+# {player}.hand_count. No Firestore a mão é um mapa {"id": quantidade}
+# (ids de deck.CARTAS): jogar ou comprar vira Increment(-1/+1) em um campo,
+# sem precisar ler a mão antes. O resto do código trabalha com
+# {"type", "value"} e as conversões acontecem só aqui.
+def ref_mao(sala_ref, caminho):
+    return sala_ref.collection("hands").document(caminho)
+
+
+def _alterar_mao(updates, caminho, cartas, delta):
+    """Acumula ±1 por carta em updates["{caminho}.hand_delta"] (não precisa da mão)."""
+    contagem = updates.setdefault(f"{caminho}.hand_delta", {})
+    for carta in cartas:
+        chave = str(codificar_carta(carta))
+        contagem[chave] = contagem.get(chave, 0) + delta
+
+
+def _separar_maos(updates):
     """
-    Aplica a jogada de uma carta (distância / ataque / defesa / segurança)
-    e atualiza o Firestore.
+    Tira os campos de mão dos updates da sala: a mão vai para o documento
+    privado e a sala recebe só {player}.hand_count.
 
-    Inclui:
-    - lógica de extensão em 700 km
-    - limite de 50 km
-    - verificação de seguranças
+    - {player}.hand (lista completa) → o documento é regravado
+    - {player}.hand_delta ({"id": ±n}) → Increment em cada carta alterada
     """
+    sala_updates, maos = {}, {}
+    for campo, valor in updates.items():
+        caminho, _, sub = campo.partition(".")
+        if sub == "hand":
+            maos[caminho] = {"hand": contar_mao(valor)}
+            sala_updates[f"{caminho}.hand_count"] = len(valor)
+        elif sub == "hand_delta":
+            alteracoes = {
+                f"hand.{chave}": firestore.Increment(delta)
+                for chave, delta in valor.items() if delta
+            }
+            if alteracoes:
+                maos[caminho] = alteracoes
+            if sum(valor.values()):
+                sala_updates[f"{caminho}.hand_count"] = firestore.Increment(sum(valor.values()))
+        else:
+            sala_updates[campo] = valor
+    return sala_updates, maos
 
-    try:
-        sala_data = sala_ref.get().to_dict() or {}
-    except Exception as e:
-        print(f"❌ Erro ao acessar Firestore em jogar_carta: {e}")
-        return "erro ao acessar a sala"
 
-    caminho = estado_jogo["meu_caminho"]
-    meu = sala_data.get(caminho, {})
+def _gravar_maos(escritor, sala_ref, maos, versoes=None):
+    """
+    Mão completa → set; alterações (Increment) → update, condicionado à
+    versão da mão em versoes ({caminho: update_time}) quando informada.
+    """
+    versoes = versoes or {}
+    for caminho, mao in maos.items():
+        if "hand" in mao:
+            escritor.set(ref_mao(sala_ref, caminho), mao)
+        else:
+            escritor.update(ref_mao(sala_ref, caminho), mao, option=_precondicao(versoes.get(caminho)))
 
-    if not meu:
-        print("⚠️ jogar_carta: dados do jogador não encontrados.")
-        return "dados do jogador não encontrados"
 
-    # cópia da mão para remoção da carta
-    nova_mao = meu.get("hand", []).copy()
-    for i, c in enumerate(nova_mao):
-        if c == carta:
-            del nova_mao[i]
-            break
+def atualizar_sala(sala_ref, updates):
+    """Grava updates da sala; as mãos vão para os documentos privados no mesmo batch."""
+    sala_updates, maos = _separar_maos(updates)
+    if not maos:
+        return atualizar_documento(sala_ref, sala_updates)
+    return _gravar_sala(sala_ref, sala_updates, maos)[0]
 
-    carta_str = carta["value"]
 
-    # ⚠️ Usar o turno do Firestore, não só o estado local
-    turno_atual = sala_data.get("turn") or estado_jogo.get("turno")
-    if turno_atual not in ("player1", "player2"):
-        # fallback defensivo
-        turno_atual = "player1"
+def _gravar_sala(sala_ref, sala_updates, maos, update_time=None, versoes_maos=None):
+    """
+    Sala + mãos num batch; com update_time / versoes_maos, só grava se
+    nenhum deles mudou (senão FailedPrecondition).
+    Retorna (resultado da sala, {caminho: resultado da mão}).
+    """
+    batch = firestore.client().batch()
+    batch.update(sala_ref, sala_updates, option=_precondicao(update_time))
+    _gravar_maos(batch, sala_ref, maos, versoes_maos)
+    resultados = batch.commit()
+
+    invalidar_cache(sala_ref, resultados[0].update_time)
+    for caminho, resultado in zip(maos, resultados[1:]):
+        invalidar_cache(ref_mao(sala_ref, caminho), resultado.update_time)
+    return resultados[0], dict(zip(maos, resultados[1:]))
+
+
+# ---------------------------------------------------
+# 🂠 Baralho privado (salas/{id}/privado/baralho)
+# ---------------------------------------------------
+# O documento da sala, que vai para os listeners dos dois jogadores, guarda
+# só deck_count e deck_id. A seed fica num sub-documento lido apenas por
+# quem compra cartas; ela não muda durante a mão, então fica em memória
+# depois da primeira leitura: uma entrada (deck_id, seed) por sala, trocada
+# a cada distribuição, apagada com a sala e limitada às salas mais recentes.
+MAX_SEEDS_EM_MEMORIA = 256
+
+_seeds_baralho = OrderedDict()
+_seeds_lock = threading.Lock()
 
-    proximo_turno = "player2" if turno_atual == "player1" else "player1"
-    tipo = carta["type"]
-    valor = carta["value"]
 
-    # --- LÓGICA DE EXTENSÃO GLOBAL (FIX) ---
-    oponente_path = "player2" if estado_jogo.get("eh_player1") else "player1"
-    oponente = sala_data.get(oponente_path, {})
+def ref_baralho(sala_ref):
+    return sala_ref.collection("privado").document("baralho")
 
-    meu_extensao = meu.get("extensao", False)
-    oponente_extensao = oponente.get("extensao", False)
-    # A extensão é ativada se EU ou o OPONENTE a ativamos.
-    limite_700_removido = meu_extensao or oponente_extensao
-    # ---------------------------------------
 
+def cartas_restantes(sala_data):
+    """Quantidade de cartas ainda no deck."""
+    return sala_data.get("deck_count", 0)
+
+
+def _guardar_seed(sala_ref, deck_id, seed):
+    with _seeds_lock:
+        _seeds_baralho[sala_ref.path] = (deck_id, seed)
+        _seeds_baralho.move_to_end(sala_ref.path)
+        while len(_seeds_baralho) > MAX_SEEDS_EM_MEMORIA:
+            _seeds_baralho.popitem(last=False)
+
+
+def _seed_do_baralho(sala_ref, sala_data):
+    deck_id = sala_data.get("deck_id")
+    with _seeds_lock:
+        guardada = _seeds_baralho.get(sala_ref.path)
+        if guardada and guardada[0] == deck_id:
+            _seeds_baralho.move_to_end(sala_ref.path)
+            return guardada[1]
+
+    baralho = ref_baralho(sala_ref).get().to_dict() or {}
+    if baralho.get("seed") is None or baralho.get("deck_id", deck_id) != deck_id:
+        raise LookupError(f"baralho da sala {sala_ref.id} não encontrado (deck_id={deck_id})")
+    _guardar_seed(sala_ref, deck_id, baralho["seed"])
+    return baralho["seed"]
+
+
+def _comprar_cartas(sala_ref, sala_data, quantidade, updates):
+    """Tira cartas do topo do deck; na sala só o deck_count é atualizado."""
+    restantes = cartas_restantes(sala_data)
+    quantidade = min(quantidade, restantes)
+    if quantidade <= 0:
+        return []
+    seed = _seed_do_baralho(sala_ref, sala_data)
+    updates["deck_count"] = restantes - quantidade
+    return cartas_do_baralho(seed, TAMANHO_BARALHO - restantes, quantidade)
+
+
+def distribuir_cartas(sala_ref, seed=None, so_sem_baralho=False):
+    """
+    Distribui 7 cartas para cada jogador. A seed do embaralhamento vai para
+    o documento privado do baralho; a sala recebe só a contagem.
+
+    so_sem_baralho: só distribui se a sala continua sem baralho (o
+    on_snapshot dos dois clientes chama isto); a escrita é condicional e,
+    se o outro cliente distribuiu antes, não faz nada.
+    """
+    if seed is None:
+        seed = nova_seed()
+    for _ in range(TENTATIVAS_ESCRITA):
+        sala_data, update_time = ler_documento_versionado(sala_ref)
+        if so_sem_baralho and (cartas_restantes(sala_data) or sala_data.get("baralho")):
+            return
+        try:
+            _gravar_distribuicao(sala_ref, sala_data, update_time, seed)
+            return
+        except FailedPrecondition:
+            invalidar_cache(sala_ref)
+    print(f"⚠️ distribuir_cartas: {TENTATIVAS_ESCRITA} conflitos seguidos, desistindo.")
+
+
+def _gravar_distribuicao(sala_ref, sala_data, update_time, seed):
+    deck_id = uuid4().hex[:8]
+    print(f"🃏 Distribuindo nova mão (deck_id={deck_id}, seed={seed})")
+
+    cartas = cartas_do_baralho(seed, 0, 2 * TAMANHO_MAO)
     updates = {
-        f"{caminho}.hand": nova_mao,
-        f"{caminho}.last_card_played": carta_str,
+        "deck_count": TAMANHO_BARALHO - 2 * TAMANHO_MAO,
+        "deck_id": deck_id,
+        "deck": firestore.DELETE_FIELD,  # formato antigo (lista completa)
+        "player1.hand": cartas[:TAMANHO_MAO],
+        "player2.hand": cartas[TAMANHO_MAO:],
+        "turn": "player1",
+        "game_status": "started",
+        "baralho": True,
+        "move_seq": 0,
     }
 
-    pass_turn = True
-
-    # ============================================================
-    # 1) CARTAS DE DISTÂNCIA
-    # ============================================================
-    if tipo == "distancia":
-        # já está aguardando extensão → não pode jogar distância
-        if meu.get("aguardando_extensao", False):
-            print("⚠️ Jogada distância bloqueada — aguardando decisão de extensão.")
-            return "você precisa escolher entre extensão ou descarte"
-
-        if meu.get("status") != "Luz Verde":
-            return "você não está com 'Luz Verde'"
-
-        valor_int = int(valor.split()[0])
-        distancia_atual = meu.get("distance", 0)
-
-        # 2️⃣ Verificação de limite 50 km vem ANTES de somar a distância
-        if meu.get("limite", False) and valor_int > 50:
-            return "o limite de 50 km está Ativo"
-
-        nova_distancia = distancia_atual + valor_int
-
-        print(
-            f"🧮 [DISTÂNCIA] {caminho}: {distancia_atual} + {valor_int} = {nova_distancia} "
-            f"(limite_700_removido={limite_700_removido})"
-        )
-
-        # ✅ Marca flag de uso de 200km (somente se carta válida)
-        if valor_int == 200:
-            updates[f"{caminho}.com_200"] = "S"
-
-        # 1️⃣ Atingiu exatamente 700km — aciona extensão
-        if not limite_700_removido and nova_distancia == 700:
-            print("⏳ EXTENSAO_PENDENTE: atingiu 700 km, aguardando decisão do jogador.")
-            updates[f"{caminho}.aguardando_extensao"] = True
-            updates[f"{caminho}.distance"] = nova_distancia
-            # ⚠️ NÃO passa o turno aqui – o mesmo jogador decide extensão
-            sala_ref.update(updates)
-            return "EXTENSAO_PENDENTE"
-
-        # 3️⃣ Bloqueio se passar de 700km sem extensão
-        if not limite_700_removido and nova_distancia > 700:
-            print("🚫 Tentativa de passar de 700km sem extensão.")
-            return "você precisa de exatos 700 km para pedir extensão ou encerrar a partida"
-
-        # 4️⃣ Bloqueio se passar de 1000km
-        if nova_distancia > 1000:
-            print("🚫 Tentativa de ultrapassar 1000 km.")
-            return "você precisa de exatos 1000 km para encerrar a partida"
-
-        # ✅ Atualiza distância
-        updates[f"{caminho}.distance"] = nova_distancia
-
-        # 🏁 Finaliza partida ao atingir 1000km
-        if nova_distancia == 1000:
-            print(f"🏁 {caminho} atingiu 1000 km — finalizando partida.")
-            updates[f"{caminho}.winner"] = True
-            updates[f"{caminho}.finalizar"] = True
-            updates["game_status"] = "finished"
-
-        pass_turn = True
-
-    # ============================================================
-    # 2) CARTAS DE ATAQUE
-    # ============================================================
-    elif tipo == "ataque":
-        oponente_data = sala_data.get(oponente_path, {})
-
-        segurancas_que_bloqueiam = {
-            "Luz Vermelha": "Caminho Livre",
-            "Limite 50 km": "Caminho Livre",
-            "Acidente": "Bom Motorista",
-            "Pneu Furado": "Pneu de Aço",
-            "Sem Gasolina": "Tanque Extra",
-        }
+    sala_updates, maos = _separar_maos(updates)
+    # formato antigo: mãos dentro do documento da sala
+    sala_updates["player1.hand"] = firestore.DELETE_FIELD
+    sala_updates["player2.hand"] = firestore.DELETE_FIELD
+
+    batch = firestore.client().batch()
+    batch.set(ref_baralho(sala_ref), {"seed": seed, "deck_id": deck_id})
+    batch.update(sala_ref, sala_updates, option=_precondicao(update_time))
+    _gravar_maos(batch, sala_ref, maos)
+    resultados = batch.commit()
+
+    _guardar_seed(sala_ref, deck_id, seed)
+    invalidar_cache(sala_ref, resultados[1].update_time)
+    for caminho, resultado in zip(maos, resultados[2:]):
+        invalidar_cache(ref_mao(sala_ref, caminho), resultado.update_time)
+
+
+def excluir_sala(sala_ref):
+    """Apaga a sala junto com os sub-documentos privados."""
+    with _seeds_lock:
+        _seeds_baralho.pop(sala_ref.path, None)
+    ref_baralho(sala_ref).delete()
+    ref_mao(sala_ref, "player1").delete()
+    ref_mao(sala_ref, "player2").delete()
+    sala_ref.delete()
+
+
+# ---------------------------------------------------
+# 🔢 Jogadas da mão (move_seq)
+# ---------------------------------------------------
+# A sala guarda só o estado atual; cada jogada é uma escrita na sala + o
+# Increment na mão de quem jogou. move_seq conta as jogadas da mão (volta a
+# 0 na distribuição) e é por ele que a UI otimista reconhece o eco da
+# própria jogada.
+def gravar_jogada_se(sala_ref, docs, updates):
+    """
+    Grava a jogada (com o move_seq seguinte) num único batch condicionado às
+    versões em docs ({path: (dados, update_time)}: a sala e a mão de quem
+    joga). Retorna os documentos como ficaram, no mesmo formato; se algum
+    mudou desde então, levanta FailedPrecondition e nada é gravado.
+    """
+    sala_data, update_time = docs[sala_ref.path]
+    updates["move_seq"] = sala_data.get("move_seq", 0) + 1
+    sala_updates, maos = _separar_maos(updates)
+    versoes_maos = {caminho: docs[ref_mao(sala_ref, caminho).path][1] for caminho in maos}
 
-        nome_seguranca = segurancas_que_bloqueiam.get(valor)
-        if nome_seguranca and nome_seguranca in oponente_data.get("safeties", []):
-            return f"o oponente está protegido pela segurança '{nome_seguranca}'"
+    resultado, resultados_maos = _gravar_sala(sala_ref, sala_updates, maos, update_time, versoes_maos)
 
-        oponente_status = oponente_data.get("status", "")
-        oponente_limite = oponente_data.get("limite", False)
+    gravados = {sala_ref.path: (_aplicar_updates(sala_data, sala_updates), resultado.update_time)}
+    for caminho, resultado_mao in resultados_maos.items():
+        path = ref_mao(sala_ref, caminho).path
+        gravados[path] = (_aplicar_updates(docs[path][0], maos[caminho]), resultado_mao.update_time)
+    return gravados
 
-        if valor == "Limite 50 km":
-            if oponente_limite:
-                return "o oponente já está com o Limite 50 km Ativo"
-            updates[f"{oponente_path}.limite"] = True
-        else:
-            if oponente_status != "Luz Verde":
-                return "o oponente não está com 'Luz Verde'"
-            updates[f"{oponente_path}.status"] = valor
-
-        pass_turn = True
-
-    # ============================================================
-    # 3) CARTAS DE DEFESA
-    # ============================================================
-    elif tipo == "defesa":
-        status = meu.get("status", "")
-        limite = meu.get("limite", False)
-
-        validacao_defesa = {
-            "Luz Verde": "Luz Vermelha",
-            "Conserto": "Acidente",
-            "Estepe": "Pneu Furado",
-            "Gasolina": "Sem Gasolina",
-        }
 
-        if valor == "Fim de Limite":
-            if not limite:
-                return "você não está com o Limite 50 km Ativo"
-            updates[f"{caminho}.limite"] = False
-        elif valor in validacao_defesa:
-            status_requerido = validacao_defesa[valor]
-            if status != status_requerido:
-                return f"você está com '{status}' e não com '{status_requerido}'"
-            updates[f"{caminho}.status"] = "Luz Verde"
+def avaliar_jogada(sala_data, estado_jogo, carta):
+    """
+    Valida a jogada contra o estado da sala sem tocar no Firestore
+    (as regras ficam em regras.aplicar; aqui só a conversão para updates).
+
+    Retorna (resultado, updates): resultado é True, "EXTENSAO_PENDENTE"
+    ou o motivo da recusa; updates só vem preenchido quando a jogada vale.
+    """
+    caminho = estado_jogo["meu_caminho"]
+    if not sala_data.get(caminho):
+        print("⚠️ avaliar_jogada: dados do jogador não encontrados.")
+        return "dados do jogador não encontrados", {}
+
+    # ⚠️ Usar o turno do Firestore, não só o estado local
+    estado = regras.estado_da_sala(sala_data, estado_jogo.get("turno"))
+    _, jogada = regras.aplicar(estado, caminho, carta)
+    if isinstance(jogada, str):
+        return jogada, {}
+
+    updates = {f"{caminho}.last_card_played": carta["value"]}
+    _alterar_mao(updates, caminho, [carta], -1)
+    updates.update(jogada.campos)
+    return jogada.resultado, updates
+
+
+def prever_jogada(sala_data, estado_jogo, carta):
+    """
+    Previsão local da jogada para a UI otimista: (resultado, sala_prevista),
+    sem ler nem gravar nada. A sala prevista já tem turno, distância etc. e o
+    move_seq seguinte; a reposição da mão só chega com o snapshot real.
+    """
+    resultado, updates = avaliar_jogada(sala_data, estado_jogo, carta)
+    if not updates:
+        return resultado, None
+    sala_updates, _ = _separar_maos(updates)
+    sala_updates["move_seq"] = sala_data.get("move_seq", 0) + 1
+    return resultado, _aplicar_updates(sala_data, sala_updates)
+
+
+def _repor_mao(sala_ref, sala_data, updates, caminho):
+    """Compra do topo do deck o que falta para 7 (pelo hand_count + alterações em updates)."""
+    na_mao = sala_data.get(caminho, {}).get("hand_count", 0)
+    na_mao += sum(updates.get(f"{caminho}.hand_delta", {}).values())
+    compradas = _comprar_cartas(sala_ref, sala_data, TAMANHO_MAO - na_mao, updates)
+    _alterar_mao(updates, caminho, compradas, +1)
+
+
+def _aplicar_updates(sala_data, updates):
+    """Devolve uma cópia de sala_data com os updates (caminhos com ponto) aplicados."""
+    nova = copy.deepcopy(sala_data)
+    for caminho, valor in updates.items():
+        *pais, campo = caminho.split(".")
+        alvo = nova
+        for chave in pais:
+            alvo = alvo.setdefault(chave, {})
+        if valor is firestore.DELETE_FIELD:
+            alvo.pop(campo, None)
+        elif isinstance(valor, firestore.Increment):
+            alvo[campo] = alvo.get(campo, 0) + valor.value
         else:
-            return "não foi possível determinar a regra de defesa"
-
-        pass_turn = True
-
-    # ============================================================
-    # 4) CARTAS DE SEGURANÇA
-    # ============================================================
-    elif tipo == "segurança":
-        segs = meu.get("safeties", [])
-        if valor in segs:
-            return "você já tem essa carta de segurança em jogo"
-
-        segs.append(valor)
-        updates[f"{caminho}.safeties"] = segs
-
-        safety_responses = meu.get("safety_responses", 0)
-
-        if valor == "Caminho Livre":
-            if meu.get("limite"):
-                updates[f"{caminho}.limite"] = False
-            if meu.get("status") == "Luz Vermelha":
-                updates[f"{caminho}.status"] = "Luz Verde"
-            safety_responses += 1
-        elif valor == "Bom Motorista":
-            if meu.get("status") == "Acidente":
-                updates[f"{caminho}.status"] = "Luz Verde"
-                safety_responses += 1
-        elif valor == "Pneu de Aço":
-            if meu.get("status") == "Pneu Furado":
-                updates[f"{caminho}.status"] = "Luz Verde"
-                safety_responses += 1
-        elif valor == "Tanque Extra":
-            if meu.get("status") == "Sem Gasolina":
-                updates[f"{caminho}.status"] = "Luz Verde"
-                safety_responses += 1
-
-        updates[f"{caminho}.safety_responses"] = safety_responses
-
-        pass_turn = True
-
-    # ============================================================
-    # 5) PASSAR TURNO (casos normais)
-    # ============================================================
-    if pass_turn:
-        updates["turn"] = proximo_turno
-
-    sala_ref.update(updates)
-    return True
-
-
-def descartar_carta(sala_ref, estado_jogo, carta):
-    meu = estado_jogo["meu"]
-    mao_atual = meu.get("hand", []).copy()
-
-    # 🔎 Busca segura por valor + tipo (e não pelo objeto)
-    index_carta = next(
-        (i for i, c in enumerate(mao_atual)
-         if c.get("value") == carta.get("value") and c.get("type") == carta.get("type")),
-        None
-    )
+            alvo[campo] = copy.deepcopy(valor)
+    return nova
 
-    if index_carta is None:
-        print("⚠️ Carta não encontrada para descarte (valor/tipo).")
-        return
 
-    # Remove corretamente
-    mao_atual.pop(index_carta)
+def _fim_de_baralho(sala_data):
+    mao1 = sala_data.get("player1", {}).get("hand_count", 0)
+    mao2 = sala_data.get("player2", {}).get("hand_count", 0)
+    return not cartas_restantes(sala_data) and mao1 == 0 and mao2 == 0
 
-    caminho = estado_jogo["meu_caminho"]
-    turno_atual = estado_jogo["turno"]
-    proximo_turno = "player2" if turno_atual == "player1" else "player1"
 
+def _updates_descarte(caminho, carta, turno_atual):
+    proximo_turno = "player2" if turno_atual == "player1" else "player1"
     updates = {
-        f"{caminho}.hand": mao_atual,
         "turn": proximo_turno,
         # f"{caminho}.last_card_played": f'{carta["value"]} (descarte)'
         f"{caminho}.last_card_played": f'{carta["value"]} <<descarte>>'
 
     }
+    _alterar_mao(updates, caminho, [carta], -1)
+    return updates
+
+
+def _updates_aceitar_extensao(caminho):
+    adversario = _oponente(caminho)
+    return {
+        "extensao_ativa": True,
+        f"{caminho}.extensao": True,  # ✅ Agora o jogador também marca que aceitou
+        f"{caminho}.aguardando_extensao": False,
+        f"{adversario}.aguardando_extensao": False,
+        "turn": adversario,
+    }
 
-    sala_ref.update(updates)
-
-    # Garante mão com 6 cartas
-    corrigir_mao_jogador(sala_ref, estado_jogo)
 
+# ---------------------------------------------------
+# 🎭 Jogadas planejadas sobre a sala em memória (ator_sala)
+# ---------------------------------------------------
+# Todas as jogadas passam pelo ator da sala: planejar_jogada aplica as
+# regras sem ler nem gravar sobre a sala que o ator tem em memória, e o
+# ator grava os updates com gravar_jogada_se().
+CARTA_FORA_DA_MAO = "carta não está na mão"
 
-def comprar_carta_do_deck(sala_ref, estado_jogo):
-    meu = estado_jogo["meu"]
-    caminho = estado_jogo["meu_caminho"]
-    turno_atual = estado_jogo["turno"]
-    proximo_turno = "player2" if turno_atual == "player1" else "player1"
 
-    sala_data = sala_ref.get().to_dict()
-    deck = sala_data.get("deck", [])
+def planejar_jogada(sala_ref, sala_data, mao, acao, caminho, carta=None):
+    """
+    acao: "jogada", "descarte" ou "extensao"; mao: a mão de quem joga
+    (lista de cartas, não usada na extensão). Retorna (resultado, updates),
+    com a reposição da mão incluída; updates vazio quando a jogada não vale.
+    """
+    if sala_data.get("game_status") == "finished":
+        return "a mão já terminou", {}
+    if acao == "extensao":
+        if not (sala_data.get(caminho) or {}).get("aguardando_extensao"):
+            return "não há extensão pendente", {}
+        return True, _updates_aceitar_extensao(caminho)
+
+    if sala_data.get("turn") and sala_data["turn"] != caminho:
+        return "não é a sua vez", {}
+    # A escrita na mão é um Increment(-1) às cegas: a carta tem que estar
+    # na mão conhecida (e a escrita só vale se a mão ainda é essa)
+    if carta not in mao:
+        return CARTA_FORA_DA_MAO, {}
+
+    if acao == "jogada":
+        estado_jogo = {"meu_caminho": caminho, "eh_player1": caminho == "player1"}
+        resultado, updates = avaliar_jogada(sala_data, estado_jogo, carta)
+        if not updates:
+            return resultado, {}
+        if carta["type"] == "distancia":
+            antes = (sala_data.get(caminho) or {}).get("distance", 0)
+            print(
+                f"🧮 [DISTÂNCIA] {caminho}: {antes} + {KM_CARTA[carta['value']]} "
+                f"= {updates.get(f'{caminho}.distance', antes)}"
+            )
+    elif acao == "descarte":
+        resultado, updates = True, _updates_descarte(caminho, carta, sala_data.get("turn") or caminho)
+    else:
+        return f"ação desconhecida: {acao}", {}
 
-    if not deck:
-        # ⚠️ Fim de jogo se todos sem cartas
-        mao1 = len(sala_data.get("player1", {}).get("hand", []))
-        mao2 = len(sala_data.get("player2", {}).get("hand", []))
-        if mao1 == 0 and mao2 == 0 and not sala_data.get("game_status") == "finished":
-            finalizar_placar_mao(sala_ref, sala_data, mao_vazia=True)
-            return
+    _repor_mao(sala_ref, sala_data, updates, caminho)
+    return resultado, updates
 
-    if deck:
-        carta_comprada = deck.pop(0)
-        mao_atual = meu.get("hand", [])
-        mao_atual.append(carta_comprada)
 
-        updates = {
-            f"{caminho}.hand": mao_atual,
-            "deck": deck,
-            f"{caminho}.last_card_played": f' {carta_comprada["value"]} (compra)'
-        }
-        sala_ref.update(updates)
+def finalizar_se_acabou(sala_ref, sala_final):
+    """Fecha o placar quando não há cartas no deck nem nas mãos. Retorna True se fechou."""
+    if _fim_de_baralho(sala_final) and sala_final.get("game_status") != "finished":
+        finalizar_placar_mao(sala_ref, sala_final, mao_vazia=True)
+        return True
+    return False
 
 
 def finalizar_placar_mao(sala_ref, sala_data, mao_vazia=False):
@@ -407,8 +615,8 @@ def finalizar_placar_mao(sala_ref, sala_data, mao_vazia=False):
 
     if mao_vazia and not winner and not winner_op:
 
-        mao_meu = len(meu.get("hand", []))
-        mao_op = len(oponente.get("hand", []))
+        mao_meu = meu.get("hand_count", 0)
+        mao_op = oponente.get("hand_count", 0)
 
         if mao_meu == 0 and mao_op > 0:
             bonus_fim_baralho = 300
@@ -514,7 +722,7 @@ def finalizar_placar_mao(sala_ref, sala_data, mao_vazia=False):
         "game_status": "finished",
     }
 
-    sala_ref.update(updates)
+    atualizar_documento(sala_ref, updates)
 
 
 def resetar_partida(sala_ref):
@@ -556,7 +764,8 @@ def resetar_partida(sala_ref):
         "player2.safety_responses": 0,
 
         # Novo deck será criado pelo distribuir_cartas()
-        "deck": [],
+        "deck_count": firestore.DELETE_FIELD,
+        "deck_id": firestore.DELETE_FIELD,
 
         # Estado geral do jogo
         "turn": None,
@@ -566,7 +775,7 @@ def resetar_partida(sala_ref):
         "player2.placar_visto": True,
     }
 
-    sala_ref.update(updates)
+    atualizar_sala(sala_ref, updates)
 
 
 def resetar_mao(sala_ref):
@@ -577,6 +786,7 @@ def resetar_mao(sala_ref):
         # Estado de jogo
         "game_status": "playing",
         "placar_calculado": False,
+        "placar_calculando": firestore.DELETE_FIELD,
         "turn": "player1",   # jogador 1 SEMPRE começa a nova mão (regra do Mille Bornes)
 
         # Flags gerais
@@ -640,7 +850,8 @@ def resetar_mao(sala_ref):
         },
 
         # Novo deck deve ser sobrescrito depois pelo jogo.py
-        "deck": [],
+        "deck_count": firestore.DELETE_FIELD,
+        "deck_id": firestore.DELETE_FIELD,
     }
 
-    sala_ref.update(updates)
\ No newline at end of file
+    atualizar_sala(sala_ref, updates)
\ No newline at end of file
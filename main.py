@@ -6,9 +6,18 @@ from pages.login import login_view
 from pages.jogo import jogo_view
 from pages.ajuda import ajuda_view
 from pages.placar import placar_view
+from registro_escutas import registro_da_pagina
+from sessao import recursos_da_sessao
 
 def main(page: ft.Page):
+    # 🧾 Escutas, tarefas e áudios da sessão são fechados quando ela termina
+    recursos_da_sessao(page)
+
     def route_change(e):
+        # Fecha as escutas do Firestore e os recursos da view anterior
+        # (ex.: o áudio do placar) antes de montar a nova
+        registro_da_pagina(page).fechar_todas()
+        recursos_da_sessao(page).encerrar_view()
         page.views.clear()
         if page.route == "/":
             page.views.append(login_view(page))
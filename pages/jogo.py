@@ -2,17 +2,29 @@
 
 import os
 import json
+import copy
+from types import MappingProxyType
 import flet as ft
 from players_area import AreaDeJogoDoJogador
+from agendador_render import agendador_da_pagina, CaixaDeSnapshots
+from armazenamento_local import armazenamento_da_pagina
+from registro_escutas import registro_da_pagina
+from ator_sala import jogar_na_sala
+from sessao import recursos_da_sessao
 from progression_bar import AreaDeProgressoComparativo
 from uuid import uuid4
-from deck import create_deck
-import threading, time
+from datetime import datetime, timezone, timedelta
+import threading
 import asyncio
 from firebase_helpers import (
-    jogar_carta, descartar_carta, corrigir_mao_jogador, distribuir_cartas,
-    obter_nome_jogador, obter_sala_jogador
+    distribuir_cartas, cartas_restantes,
+    obter_nome_jogador, obter_sala_jogador,
+    ler_documento, atualizar_documento, atualizar_se, ref_mao,
+    prever_jogada,
+    CAMPOS_PLACAR, CAMPOS_FIM_DE_BARALHO
 )
+from deck import decodificar_mao
+import regras
 from firebase_admin import credentials, firestore, initialize_app, _apps
 
 # 🔥 Inicializa Firebase apenas uma vez
@@ -33,6 +45,27 @@ db = firestore.client()
 
 COLLECTION = "salas"
 
+# Segundos que uma jogada otimista aceita pelo ator espera o próprio eco;
+# depois disso a tela volta para a última sala real recebida
+PRAZO_ECO_JOGADA = 5
+
+# Depois desse tempo a reserva do cálculo do placar é considerada
+# abandonada (cliente caiu no meio) e o outro cliente assume
+PRAZO_RESERVA_PLACAR = timedelta(seconds=30)
+
+
+def reserva_de_placar(data):
+    """{"por", "desde"} de quem reservou o cálculo do placar, ou {}."""
+    reserva = data.get("placar_calculando")
+    # reserva sem horário (versão antiga) conta como abandonada
+    return reserva if isinstance(reserva, dict) and reserva.get("desde") else {}
+
+
+def reserva_de_placar_ativa(data):
+    """True se algum cliente reservou o cálculo do placar há pouco tempo."""
+    reserva = reserva_de_placar(data)
+    return bool(reserva) and datetime.now(timezone.utc) - reserva["desde"] < PRAZO_RESERVA_PLACAR
+
 
 def jogo_view(page: ft.Page):
     print('Jogo View')
@@ -41,13 +74,16 @@ def jogo_view(page: ft.Page):
     page.padding = 20
     page.window.center()
 
+    # 💾 client_storage com cache na sessão (lê cada chave uma vez)
+    armazenamento = armazenamento_da_pagina(page)
+
     # 🔐 Persistência do ID do jogador (não gerar novo ID a cada partida)
-    if not page.client_storage.contains_key("jogador_id"):
+    if not armazenamento.contains_key("jogador_id"):
         novo_id = str(uuid4())
-        page.client_storage.set("jogador_id", novo_id)
+        armazenamento.set("jogador_id", novo_id)
         print(f"🔥 Novo JOGADOR_ID criado = {novo_id}")
 
-    jogador_id = page.client_storage.get("jogador_id")
+    jogador_id = armazenamento.get("jogador_id")
     print(f"🔥 JOGADOR_ID = {jogador_id}")
 
     nome_jogador = obter_nome_jogador(page)
@@ -65,27 +101,55 @@ def jogo_view(page: ft.Page):
 
     sala_ref = db.collection(COLLECTION).document(sala_jogador)
 
+    # 🖼️ Listeners, resize e barras só marcam o que mudou; um flush por quadro
+    render = agendador_da_pagina(page)
+    escutas = registro_da_pagina(page)
+    recursos = recursos_da_sessao(page)  # tarefas canceladas com a sessão
+
     nome_oponente = ft.Ref[ft.Text]()
     nome_local = ft.Ref[ft.Text]()
     turno_info = ft.Text(size=16, weight=ft.FontWeight.W_500, color=ft.Colors.GREY_600)
 
-    # Estado do jogo
-    estado_jogo = {
+    # Estado do jogo — imutável: cada mudança publica um novo mapeamento
+    # congelado, trocado de uma vez. Quem lê (handlers do Flet, helpers do
+    # Firestore) pega estado_atual() e trabalha sobre aquela versão. O
+    # congelamento é raso: "sala" e "meu" são cópias desta sessão (ver
+    # processar_sala) e ninguém as altera depois de publicadas.
+    estado = {"atual": MappingProxyType({
         "eh_player1": True,
         "turno": "player1",
         "meu": {},
         "meu_caminho": "",
         "ja_exibiu_placar": False,
-        "deck_atual": []
-    }
+        "mao": [],
+        "cartas_no_deck": 0
+    })}
+    estado_lock = threading.Lock()
+
+    def estado_atual():
+        return estado["atual"]
+
+    def publicar_estado(**mudancas):
+        with estado_lock:
+            estado["atual"] = MappingProxyType({**estado["atual"], **mudancas})
 
     # ✅ Recupera quem é o jogador (player1/player2), se já foi salvo
-    if page.client_storage.contains_key("meu_caminho"):
-        estado_jogo["meu_caminho"] = page.client_storage.get("meu_caminho")
-        # print(f'Estado do Jogo {estado_jogo["meu_caminho"]}')
+    if armazenamento.contains_key("meu_caminho"):
+        publicar_estado(meu_caminho=armazenamento.get("meu_caminho"))
+        # print(f'Estado do Jogo {estado_atual()["meu_caminho"]}')
+
+    armazenamento.set("placar_enviado", False)
+    publicar_estado(ja_exibiu_dialogo_extensao=False)
 
-    page.client_storage.set("placar_enviado", False)
-    estado_jogo["ja_exibiu_dialogo_extensao"] = False
+    # 🧮 Últimas entradas de cada seção da UI (por sessão): o on_snapshot só
+    # redesenha a seção cujas entradas mudaram desde o snapshot anterior.
+    ultimo_render = {}
+
+    def mudou(secao, *entradas):
+        if ultimo_render.get(secao) == entradas:
+            return False
+        ultimo_render[secao] = copy.deepcopy(entradas)
+        return True
 
     # Refs para os componentes globais e a barra de progresso
     nome_oponente = ft.Ref[ft.Text]()  # Nome do oponente na área principal
@@ -277,16 +341,23 @@ def jogo_view(page: ft.Page):
             page.dialog = None
         page.update()
 
-    def confirmar_descarte(e=None):
+    async def confirmar_descarte(e=None):
         if getattr(page, "dialog", None) and getattr(page.dialog, "open", False):
             page.dialog.open = False
             page.update()
 
         carta = carta_para_descarte["valor"]
-        descartar_carta(sala_ref, estado_jogo, carta)
+        # 🎭 descarte, reposição e passagem do turno: ator da sala, em ordem
+        resultado = await jogar_na_sala(page, sala_ref, "descarte", estado_atual()["meu_caminho"], carta)
         confirm_dialog.open = False
         page.dialog = None
-        page.snack_bar = ft.SnackBar(ft.Text(f"🗑️ Carta descartada: {carta['value']} ({carta['type']})"))
+        if resultado is True:
+            aviso = f"🗑️ Carta descartada: {carta['value']} ({carta['type']})"
+        elif resultado is None:
+            aviso = "⚠️ O servidor não respondeu ao descarte, tente de novo."
+        else:
+            aviso = f"⚠️ Descarte recusado: {resultado}"
+        page.snack_bar = ft.SnackBar(ft.Text(aviso))
         page.snack_bar.open = True
         page.update()
 
@@ -302,18 +373,18 @@ def jogo_view(page: ft.Page):
             # Oculta o footer em dispositivos móveis
             footer_container_ref.current.visible = not is_mobile_width
 
-        page.update()
+        render.marcar_pagina()
 
     def atualizar_barras(distancia_jogador, distancia_computador):
         # As refs são usadas diretamente para atualizar as barras de progresso
         # O .page é usado como uma checagem de segurança (controle anexado)
         if barra_distancia_jogador.current and barra_distancia_jogador.current.page:
             barra_distancia_jogador.current.value = distancia_jogador / LIMITE_DISTANCIA
-            barra_distancia_jogador.current.update()
+            render.marcar(barra_distancia_jogador.current)
 
         if barra_distancia_computador.current and barra_distancia_computador.current.page:
             barra_distancia_computador.current.value = distancia_computador / LIMITE_DISTANCIA
-            barra_distancia_computador.current.update()
+            render.marcar(barra_distancia_computador.current)
 
     def mostrar_extensao_dialogo(e=None):
         print("🪧 Abrindo diálogo de extensão...")
@@ -323,28 +394,21 @@ def jogo_view(page: ft.Page):
         dialog_extensao.open = True
         page.update()
 
-    def aceitar_extensao(e):
+    async def aceitar_extensao(e):
         print("🟢 Jogador ACEITOU a extensão — ativando e passando turno.")
 
-        eh_player1_local = estado_jogo.get("eh_player1", None)
+        eh_player1_local = estado_atual().get("eh_player1", None)
         if eh_player1_local is None:
             print("⚠️ ERRO: estado_jogo['eh_player1'] não definido.")
             return
 
         meu_caminho = "player1" if eh_player1_local else "player2"
-        adversario = "player2" if eh_player1_local else "player1"
-        novo_turno = adversario
 
-        try:
-            sala_ref.update({
-                "extensao_ativa": True,
-                f"{meu_caminho}.extensao": True,  # ✅ Agora o jogador também marca que aceitou
-                f"{meu_caminho}.aguardando_extensao": False,
-                f"{adversario}.aguardando_extensao": False,
-                "turn": novo_turno
-            })
-        except Exception as ex:
-            print(f"⚠️ Erro ao ativar extensão/turno: {ex}")
+        resultado = await jogar_na_sala(page, sala_ref, "extensao", meu_caminho)
+        if resultado is not True:
+            print(f"⚠️ Erro ao ativar extensão/turno: {resultado}")
+            # o diálogo volta no próximo snapshot, se a extensão ainda estiver pendente
+            publicar_estado(ja_exibiu_dialogo_extensao=False)
 
         dialog_extensao.open = False
         page.update()
@@ -355,10 +419,10 @@ def jogo_view(page: ft.Page):
         Encerra corretamente a mão para AMBOS os jogadores.
         """
         try:
-            meu_caminho = estado_jogo.get("meu_caminho")
+            meu_caminho = estado_atual().get("meu_caminho")
 
             if not meu_caminho:
-                snap = sala_ref.get().to_dict() or {}
+                snap = ler_documento(sala_ref)
                 p1 = snap.get("player1", {})
                 p2 = snap.get("player2", {})
                 if p1.get("id") == jogador_id:
@@ -368,14 +432,14 @@ def jogo_view(page: ft.Page):
                 else:
                     print("⚠️ recusar_extensao: não consegui determinar o caminho do jogador.")
                     return
-                estado_jogo["meu_caminho"] = meu_caminho
+                publicar_estado(meu_caminho=meu_caminho)
 
             adversario = "player1" if meu_caminho == "player2" else "player2"
 
             print(f"🚫 {meu_caminho} recusou a extensão. Encerrando partida DEFINITIVAMENTE.")
 
             # 🔥 ENCERRA A MÃO PARA AMBOS
-            sala_ref.update({
+            atualizar_documento(sala_ref, {
                 f"{meu_caminho}.aguardando_extensao": False,
                 f"{meu_caminho}.finalizar": True,
                 f"{meu_caminho}.extensao": False,
@@ -388,7 +452,7 @@ def jogo_view(page: ft.Page):
                 "extensao_ativa": False
             })
 
-            estado_jogo["ja_exibiu_dialogo_extensao"] = True
+            publicar_estado(ja_exibiu_dialogo_extensao=True)
 
             async def fechar_dialogo_e_redirecionar():
 
@@ -403,23 +467,20 @@ def jogo_view(page: ft.Page):
                 # Evita duplo disparo
                 page.on_keyboard_event = None
 
-                # 🔥 Calcula o placar uma ÚNICA vez
+                # 🔥 Calcula o placar uma ÚNICA vez (Firestore fora do loop)
                 try:
-                    calcular_e_enviar_placar_final(sala_ref, estado_jogo)
+                    await asyncio.to_thread(calcular_e_enviar_placar_final, sala_ref, estado_atual())
                 except Exception as exc:
                     print(f"⚠️ Erro ao calcular placar em recusar_extensao: {exc}")
 
-                estado_jogo["ja_exibiu_placar"] = True
+                publicar_estado(ja_exibiu_placar=True)
 
                 await asyncio.sleep(1.0)
 
                 # Redireciona
-                try:
-                    page.go("/placar")
-                except Exception as exc:
-                    print(f"⚠️ Erro ao redirecionar para /placar: {exc}")
+                await asyncio.to_thread(ir_para_placar)
 
-            page.run_task(fechar_dialogo_e_redirecionar)
+            recursos.tarefa(fechar_dialogo_e_redirecionar)
 
         except Exception as exc:
             print(f"⚠️ Erro geral em recusar_extensao: {exc}")
@@ -436,70 +497,157 @@ def jogo_view(page: ft.Page):
     )
 
     def distribuir_cartas_internamente():
-        deck = create_deck()
-        distribuir_cartas(sala_ref, deck)
+        # condicional: se o outro cliente já distribuiu, não faz nada
+        distribuir_cartas(sala_ref, so_sem_baralho=True)
 
     # 🧩 Flag global para evitar múltiplos cliques rápidos
     bloqueio_clique = {"ativo": False}
 
-    def tentar_jogar_carta(carta):
+    # 🔮 Jogada otimista: a sala prevista vai para a tela na hora, a escrita
+    # segue no handler do clique e o snapshot real confirma (chega o move_seq
+    # previsto, ou já é outra mão: move_seq volta a 0 a cada distribuição).
+    # Se a jogada não vale, o ator não responde ou o eco não chega a tempo,
+    # a tela volta para a última sala real.
+    previsao = {"chave": None}  # (deck_id, move_seq) da sala prevista
+    confirmado = {"sala": None, "mao": []}
+
+    def no_loop(funcao, *args):
+        async def executar():
+            funcao(*args)
+
+        recursos.tarefa(executar)
+
+    def mostrar_previsao(prevista, mao, chave):
+        if previsao["chave"] != chave:
+            return  # já confirmada ou desfeita
+        eh_player1 = estado_atual()["eh_player1"]
+        jogador_1 = prevista.get("player1", {}) or {}
+        jogador_2 = prevista.get("player2", {}) or {}
+        meu, oponente = (jogador_1, jogador_2) if eh_player1 else (jogador_2, jogador_1)
+        publicar_estado(mao=mao, meu=meu, sala=prevista, turno=prevista.get("turn") or "")
+        if mostrar_sala(prevista, meu, oponente):
+            render.marcar_pagina()
+
+    def desfazer_previsao(chave):
+        if previsao["chave"] != chave:
+            return  # já confirmada (ou é de outra jogada)
+        previsao["chave"] = None
+        publicar_estado(mao=confirmado["mao"])
+        if confirmado["sala"]:
+            processar_dados_sala(confirmado["sala"])
+
+    def prever(carta):
+        """
+        Desenha a jogada antes da escrita. Retorna a chave da previsão na
+        tela (para desfazer_previsao / esperar_eco), ou None.
+        """
+        sala = estado_atual().get("sala")
+        mao = list(estado_atual().get("mao", []))
+        if not sala or previsao["chave"] is not None or carta not in mao:
+            return None
+        _, prevista = prever_jogada(sala, estado_atual(), carta)
+        if prevista is None:
+            return None
+        mao.remove(carta)
+        chave = previsao["chave"] = (prevista.get("deck_id"), prevista["move_seq"])
+        no_loop(mostrar_previsao, prevista, mao, chave)
+        return chave
+
+    def esperar_eco(chave):
+        """Desfaz a previsão se o snapshot da jogada não chegar no prazo."""
+        async def expirar():
+            await asyncio.sleep(PRAZO_ECO_JOGADA)
+            if previsao["chave"] == chave:
+                print("⚠️ O snapshot da jogada não chegou — voltando para a última sala recebida.")
+                desfazer_previsao(chave)
+
+        recursos.tarefa(expirar)
+
+    def pedir_descarte(carta, motivo):
+        carta_para_descarte["valor"] = carta
+        carta_para_descarte["motivo"] = motivo
+
+        confirm_dialog.content = ft.Text(
+            f"A carta '{carta['value']}' não pode ser jogada agora porque {motivo}.\n\n"
+            f"Deseja descartá-la?"
+        )
+
+        confirm_dialog.actions = [
+            ft.TextButton("Não", on_click=fechar_dialogo),
+            ft.ElevatedButton("Sim", on_click=confirmar_descarte, autofocus=True)
+        ]
+
+        page.dialog = confirm_dialog
+        confirm_dialog.open = True
+        page.update()
+
+    async def tentar_jogar_carta(carta):
         # Impede duplo clique enquanto a jogada anterior ainda é processada
         if bloqueio_clique["ativo"]:
             print("⏳ Clique ignorado — jogada anterior ainda em andamento.")
             return
 
         bloqueio_clique["ativo"] = True  # 🔒 Ativa bloqueio temporário
+        previsto = None
 
         try:
-            # Sucesso pode ser True, "EXTENSAO_PENDENTE", ou a string de MOTIVO
-            sucesso = jogar_carta(sala_ref, estado_jogo, carta)
-            if sucesso is True:
-                corrigir_mao_jogador(sala_ref, estado_jogo)
-                return  # ✅ encerra fluxo corretamente
+            # Carta que o último snapshot já marcou como só-descarte: o motivo
+            # vem da avaliação local e o diálogo abre sem ir ao Firestore
+            sucesso = estado_atual().get("jogadas", {}).get((carta["type"], carta["value"]))
+            if isinstance(sucesso, str):
+                pedir_descarte(carta, sucesso)
+                return
 
-            elif sucesso == "EXTENSAO_PENDENTE":
-                print("⏳ Extensão pendente. Aguardando decisão do jogador.")
+            previsto = prever(carta)
 
-                # 🛠️ Corrige a mão mesmo com extensão pendente
-                corrigir_mao_jogador(sala_ref, estado_jogo)
+            # Sucesso pode ser True, "EXTENSAO_PENDENTE", ou a string de MOTIVO.
+            # O ator da sala aplica as jogadas das duas sessões uma de cada
+            # vez (a mão já volta completa da mesma escrita)
+            sucesso = await jogar_na_sala(page, sala_ref, "jogada", estado_atual()["meu_caminho"], carta)
+            gravada = sucesso is True or sucesso == "EXTENSAO_PENDENTE"
+            if previsto:
+                if gravada:
+                    esperar_eco(previsto)  # o snapshot da jogada confirma a previsão
+                else:
+                    # recusada ou sem resposta: volta a tela para a última sala real
+                    no_loop(desfazer_previsao, previsto)
 
-                def recheck():
-                    time.sleep(0.8)
-                    snapshot = sala_ref.get()
-                    on_snapshot([snapshot], None, None)
+            if sucesso is True:
+                return  # ✅
 
-                threading.Thread(target=recheck).start()
+            elif sucesso is None:
+                # o ator não respondeu
+                page.snack_bar = ft.SnackBar(ft.Text("⚠️ O servidor não respondeu à jogada, tente de novo."))
+                page.snack_bar.open = True
+                page.update()
+                return
+
+            elif sucesso == "EXTENSAO_PENDENTE":
+                # o diálogo abre com o snapshot da jogada (passo 9)
+                print("⏳ Extensão pendente. Aguardando decisão do jogador.")
                 return  # ✅ encerra fluxo corretamente
 
             else:
-                carta_para_descarte["valor"] = carta
-
+                # A escrita não valeu
                 motivo = sucesso if isinstance(sucesso, str) else "motivo não especificado pela regra"
-                carta_para_descarte["motivo"] = motivo
-
-                confirm_dialog.content = ft.Text(
-                    f"A carta '{carta['value']}' não pode ser jogada agora porque {motivo}.\n\n"
-                    f"Deseja descartá-la?"
-                )
-
-                confirm_dialog.actions = [
-                    ft.TextButton("Não", on_click=fechar_dialogo),
-                    ft.ElevatedButton("Sim", on_click=confirmar_descarte, autofocus=True)
-                ]
-
-                page.dialog = confirm_dialog
-                confirm_dialog.open = True
-                page.update()
+                pedir_descarte(carta, motivo)
 
                 return  # 🔥🔥🔥 ESSA LINHA É A MAIS IMPORTANTE 🔥🔥🔥
 
+        except Exception as e:
+            print(f"⚠️ Erro ao jogar carta: {e}")
+            if previsto:
+                no_loop(desfazer_previsao, previsto)
+
         finally:
             # 🔓 Libera o clique após pequeno intervalo (para evitar duplo toque)
-            def liberar_bloqueio():
-                time.sleep(0.6)
-                bloqueio_clique["ativo"] = False
+            async def liberar_bloqueio():
+                try:
+                    await asyncio.sleep(0.6)
+                finally:
+                    bloqueio_clique["ativo"] = False
 
-            threading.Thread(target=liberar_bloqueio).start()
+            recursos.tarefa(liberar_bloqueio)
 
     # 🔆 NOVO: função para atualizar o semáforo com base em status/limite (não mais no turno)
     def atualizar_semaforo(area: AreaDeJogoDoJogador, jogador_data: dict):
@@ -521,279 +669,416 @@ def jogo_view(page: ft.Page):
         # Garante que o controle existe
         if getattr(area, "traffic_light", None) and area.traffic_light.current:
             area.traffic_light.current.src = img
-            try:
-                area.traffic_light.current.update()
-            except Exception:
-                pass
+            render.marcar(area.traffic_light.current)
 
-    def on_snapshot(doc_snapshot, changes, read_time):
-        if not doc_snapshot:
-            return
+    def atualizar_area_local():
+        """
+        Mão + turno do jogador local (chamado pelos listeners da sala e da mão).
+        Retorna True se a área foi redesenhada.
+        """
+        meu = estado_atual().get("meu")
+        if not meu or not area_jogador_local:
+            return False
+
+        mao_atual = estado_atual().get("mao", [])
+        tem_cartas = len(mao_atual) > 0
+        turno_meu = estado_atual().get("turno") == estado_atual().get("meu_caminho")
+
+        is_my_turn = turno_meu and tem_cartas
+
+        # Se eu estou com diálogo de extensão aberto,
+        # continuo “com a vez”, mas não deixo clicar outra carta.
+        if meu.get("aguardando_extensao", False):
+            is_my_turn = True
+
+        # ✅ Jogável ou só-descarte, carta a carta, avaliado sobre a sala em
+        # memória (regras.avaliar_mao): o botão já mostra e o clique não
+        # precisa ir ao Firestore para descobrir que a carta não vale.
+        sala = estado_atual().get("sala")
+        jogadas = regras.avaliar_mao(
+            regras.estado_da_sala(sala), estado_atual()["meu_caminho"], mao_atual
+        ) if sala else {}
+        publicar_estado(jogadas=jogadas)
+
+        cartas_no_deck = estado_atual().get("cartas_no_deck", 0)
+        if not mudou("area_local", meu, mao_atual, is_my_turn, cartas_no_deck, jogadas):
+            return False
+
+        area_jogador_local.atualizar_ui(
+            {**meu, "hand": mao_atual},
+            is_my_turn,
+            cartas_no_deck,
+            tentar_jogar_carta,
+            jogadas,
+        )
+        return True
 
-        for doc in doc_snapshot:
-            data = doc.to_dict()
-            if not data:
-                return
+    # ✋ Listener da mão privada: só a minha mão chega a esta sessão
+    listener_mao = {"caminho": None}
+    ciclo = {"suspensa": False}  # escutas largadas enquanto a aba está oculta
 
-            # ---------------------------------------------------------
-            # 1) REDIRECIONAMENTO RÁPIDO PARA PLACAR (se já terminou)
-            # ---------------------------------------------------------
-            if (
-                    data.get("game_status") == "finished"
-                    and not data.get("player1", {}).get("aguardando_extensao", False)
-                    and not data.get("player2", {}).get("aguardando_extensao", False)
-                    and data.get("placar_calculado", False)
-            ):
-                print("🏁 Partida encerrada — redirecionando para o placar.")
-                try:
-                    page.go("/placar")
-                except Exception as exc:
-                    print(f"⚠️ Erro ao ir para placar no snapshot: {exc}")
-                return
+    def processar_mao(doc):
+        confirmado["mao"] = decodificar_mao((doc.to_dict() or {}).get("hand"))
+        publicar_estado(mao=confirmado["mao"])
 
-            # ---------------------------------------------------------
-            # 2) BLOQUEIO LOCAL TEMPORÁRIO (ex: enquanto um diálogo está aberto)
-            # ---------------------------------------------------------
-            if estado_jogo.get("bloquear_atualizacoes", False):
-                return
+        if atualizar_area_local():
+            render.marcar_pagina()
 
-            jogador_1 = data.get("player1", {}) or {}
-            jogador_2 = data.get("player2", {}) or {}
+    caixa_mao = CaixaDeSnapshots(page, processar_mao, recursos)
+
+    def on_snapshot_mao(doc_snapshot, changes, read_time):
+        for doc in doc_snapshot:
+            caixa_mao.receber(doc)
 
-            p1_id = jogador_1.get("id")
-            p2_id = jogador_2.get("id")
+    def escutar_mao(caminho):
+        if ciclo["suspensa"]:
+            return
+        if listener_mao["caminho"] == caminho and escutas.ativa("mao"):
+            return
+        listener_mao["caminho"] = caminho
+        escutas.escutar("mao", ref_mao(sala_ref, caminho), on_snapshot_mao)
+
+    def registrar_na_vaga(data):
+        """Decisão do auto-registro, refeita sobre a sala mais recente a cada tentativa."""
+        p1_id = (data.get("player1") or {}).get("id")
+        p2_id = (data.get("player2") or {}).get("id")
+        if jogador_id in (p1_id, p2_id):
+            return None
+        vaga = "player1" if not p1_id else "player2" if not p2_id else None
+        if not vaga:
+            return None
+        return {
+            vaga: {
+                "id": jogador_id,
+                "nome": nome_jogador,
+                "distance": 0,
+                "status": "Luz Vermelha",
+                "limite": False,
+                "last_card_played": "Nenhuma",
+                "safeties": [],
+                "com_200": "N",
+                "hand_count": 0,
+                "finalizar": False,
+                "placar": {"total_geral": 0, "atual_mao": {}}
+            }
+        }
+
+    def ir_para_placar():
+        try:
+            page.go("/placar")
+        except Exception as exc:
+            print(f"⚠️ Erro ao ir para placar no snapshot: {exc}")
 
-            # ---------------------------------------------------------
-            # 3) IDENTIFICAÇÃO DO JOGADOR
-            # ---------------------------------------------------------
-            if jogador_id == p1_id:
-                eh_player1 = True
-            elif jogador_id == p2_id:
-                eh_player1 = False
+    def corrigir_turno(novo_turno):
+        try:
+            atualizar_se(sala_ref, lambda d: (
+                None if d.get("turn") in ("player1", "player2") else {"turn": novo_turno}
+            ))
+        except Exception as e:
+            print(f"⚠️ Erro ao corrigir turno: {e}")
+
+    def calcular_placar_e_ir(jogador_1, jogador_2, cartas_no_deck, estado_jogo):
+        # Só um cliente calcula: reserva o cálculo com escrita condicional
+        # (ou assume uma reserva vencida)
+        if not atualizar_se(sala_ref, lambda d: (
+            None if d.get("placar_calculado") or reserva_de_placar_ativa(d)
+            else {"placar_calculando": {"por": jogador_id, "desde": datetime.now(timezone.utc)}}
+        )):
+            return
+        try:
+            # print("🧮 Calculando placar final...")
+
+            mao1 = jogador_1.get("hand_count", 0)
+            mao2 = jogador_2.get("hand_count", 0)
+            fim_de_baralho = (not cartas_no_deck) and mao1 == 0 and mao2 == 0
+
+            if fim_de_baralho:
+                # 🔥 Caso especial: fim de baralho
+                finalizar_mao_por_fim_de_baralho(sala_ref)
             else:
-                # auto-registro se ainda não estiver na sala
-                if not p1_id:
-                    sala_ref.update({
-                        "player1": {
-                            "id": jogador_id,
-                            "nome": nome_jogador,
-                            "distance": 0,
-                            "status": "Luz Vermelha",
-                            "limite": False,
-                            "last_card_played": "Nenhuma",
-                            "safeties": [],
-                            "com_200": "N",
-                            "hand": [],
-                            "finalizar": False,
-                            "placar": {"total_geral": 0, "atual_mao": {}}
-                        }
-                    })
-                elif not p2_id:
-                    sala_ref.update({
-                        "player2": {
-                            "id": jogador_id,
-                            "nome": nome_jogador,
-                            "distance": 0,
-                            "status": "Luz Vermelha",
-                            "limite": False,
-                            "last_card_played": "Nenhuma",
-                            "safeties": [],
-                            "com_200": "N",
-                            "hand": [],
-                            "finalizar": False,
-                            "placar": {"total_geral": 0, "atual_mao": {}}
-                        }
-                    })
-                return
+                # 🛣 Caso normal: 700 / 1000 / recusa de extensão
+                calcular_e_enviar_placar_final(sala_ref, estado_jogo, reescrever_placar=False)
 
-            # ---------------------------------------------------------
-            # 4) ATUALIZAR REFERÊNCIAS DO JOGADOR (CRÍTICO)
-            #    SEMPRE usar o estado mais recente do Firestore
-            # ---------------------------------------------------------
-            estado_jogo["eh_player1"] = eh_player1
+            atualizar_documento(sala_ref, {
+                "placar_calculado": True,
+                "placar_calculando": firestore.DELETE_FIELD,
+            })
+            # print("✅ Placar calculado e salvo no Firestore.")
+            page.go("/placar")
+        except Exception as e:
+            print(f"⚠️ Erro ao calcular placar final: {e}")
+            # libera a reserva para o outro cliente tentar (se ainda é nossa)
+            atualizar_se(sala_ref, lambda d: (
+                {"placar_calculando": firestore.DELETE_FIELD}
+                if reserva_de_placar(d).get("por") == jogador_id else None
+            ))
+
+    def mostrar_sala(data, meu, oponente):
+        """
+        Passo 11 do processar_sala: redesenha as seções cujas entradas mudaram
+        (a sala pode ser a real ou a prevista por uma jogada otimista).
+        Retorna True se algo precisa de page.update().
+        """
+        cartas_no_deck = cartas_restantes(data)
+        publicar_estado(cartas_no_deck=cartas_no_deck)
+        houve_mudanca = False
+
+        # Nome do oponente
+        nome_op = oponente.get("nome", "Oponente")
+        if mudou("nome_oponente", nome_op):
+            houve_mudanca = True
+            if nome_oponente is not None and getattr(nome_oponente, "current", None):
+                nome_oponente.current.value = nome_op
 
-            meu = jogador_1 if eh_player1 else jogador_2
-            oponente = jogador_2 if eh_player1 else jogador_1
+            if progression_bars_area:
+                progression_bars_area.atualizar_nomes(nome_op)
 
-            estado_jogo["meu"] = meu
-            estado_jogo["meu_caminho"] = "player1" if eh_player1 else "player2"
+            if area_oponente:
+                area_oponente.update_nome_jogador(nome_op)
 
-            turno_atual = data.get("turn", "") or ""
-            estado_jogo["turno"] = turno_atual
+        # Label “Cartas no deck”
+        if mudou("cartas_no_deck", cartas_no_deck):
+            houve_mudanca = True
+            if nome_local is not None and getattr(nome_local, "current", None):
+                nome_local.current.value = f"🃏 Cartas no deck: {cartas_no_deck}"
 
-            # ---------------------------------------------------------
-            # 5) FAILSAFE DE TURNO (se algo ficar sem "player1"/"player2")
-            # ---------------------------------------------------------
-            if turno_atual not in ("player1", "player2"):
-                novo_turno = "player1" if p1_id else "player2"
-                try:
-                    sala_ref.update({"turn": novo_turno})
-                    estado_jogo["turno"] = novo_turno
-                    turno_atual = novo_turno
-                except Exception as e:
-                    print(f"⚠️ Erro ao corrigir turno: {e}")
-
-            # ---------------------------------------------------------
-            # 6) STORAGE LOCAL
-            # ---------------------------------------------------------
-            try:
-                page.client_storage.set("meu_caminho", estado_jogo["meu_caminho"])
-                page.client_storage.set("eh_player1", eh_player1)
-            except Exception:
-                pass
-
-            # ---------------------------------------------------------
-            # 7) RESET UI QUANDO O DECK É CRIADO
-            # ---------------------------------------------------------
-            if (
-                    data.get("game_status") == "started"
-                    and "deck" in data
-                    and not estado_jogo.get("resetei_para_nova_mao", False)
-            ):
-                print("🔄 Reset completo da UI para nova mão (gatilho: deck recriado).")
-                estado_jogo["ja_exibiu_dialogo_extensao"] = False
-                estado_jogo["ja_exibiu_placar"] = False
-                estado_jogo["resetei_para_nova_mao"] = True
-
-            if data.get("game_status") == "finished":
-                estado_jogo["resetei_para_nova_mao"] = False
-
-            # ---------------------------------------------------------
-            # 8) SE O DECK SUMIU → CRIA NOVO
-            # ---------------------------------------------------------
-            if ("deck" not in data or not data["deck"]) and not data["baralho"]:
-                print("🔄 Reset completo da UI para nova mão (deck removido ou vazio).")
-                if p1_id and p2_id:
-                    distribuir_cartas_internamente()
-                return
+        # Área do jogador local
+        if atualizar_area_local():
+            houve_mudanca = True
 
-            # ---------------------------------------------------------
-            # 9) EXTENSÃO (mostrar diálogo quando EU estou aguardando)
-            # ---------------------------------------------------------
-            if (
-                    meu.get("aguardando_extensao", False)
-                    and not estado_jogo.get("ja_exibiu_dialogo_extensao", False)
-            ):
-                print("⏳ Extensão pendente — exibindo diálogo.")
-                estado_jogo["ja_exibiu_dialogo_extensao"] = True
-                mostrar_extensao_dialogo()
-
-            # ---------------------------------------------------------
-            # 10) CÁLCULO DE is_my_turn
-            # ---------------------------------------------------------
-            mao_atual = meu.get("hand", []) or []
-            tem_cartas = len(mao_atual) > 0
-
-            turno_meu = (
-                    (eh_player1 and turno_atual == "player1") or
-                    (not eh_player1 and turno_atual == "player2")
-            )
+        # Área do oponente
+        if area_oponente and mudou("area_oponente", oponente):
+            houve_mudanca = True
+            area_oponente.atualizar_ui(oponente)
 
-            is_my_turn = turno_meu and tem_cartas
+        # 🔆 Semáforos — baseados SOMENTE no status + limite 50km
+        if area_jogador_local and mudou("semaforo_local", meu.get("status"), meu.get("limite")):
+            atualizar_semaforo(area_jogador_local, meu)
+        if area_oponente and mudou("semaforo_oponente", oponente.get("status"), oponente.get("limite")):
+            atualizar_semaforo(area_oponente, oponente)
 
-            # Se eu estou com diálogo de extensão aberto,
-            # continuo “com a vez”, mas não deixo clicar outra carta.
-            if meu.get("aguardando_extensao", False):
-                is_my_turn = True
+        # Barras de progresso
+        distancias = (meu.get("distance", 0), oponente.get("distance", 0))
+        if callable(atualizar_barras) and mudou("barras", *distancias):
+            atualizar_barras(*distancias)
 
-            # ---------------------------------------------------------
-            # 11) ATUALIZAÇÕES DE UI (SEGURO)
-            # ---------------------------------------------------------
-            deck = data.get("deck", [])  # garante que deck existe
+        return houve_mudanca
 
-            # Nome do oponente
-            if nome_oponente is not None and getattr(nome_oponente, "current", None):
-                nome_oponente.current.value = oponente.get("nome", "Oponente")
+    def processar_sala(doc):
+        """
+        Processa o snapshot mais recente da sala (entregue pela caixa_snapshots
+        no loop da página). Enquanto há jogada prevista na tela, snapshots
+        anteriores a ela (move_seq menor) ficam só guardados.
+        """
+        data = doc.to_dict()
+        if not data:
+            return
+        # o snapshot é compartilhado entre as sessões: esta fica com uma cópia
+        data = copy.deepcopy(data)
+
+        confirmado["sala"] = data
+        if previsao["chave"] is not None:
+            deck_id, seq = previsao["chave"]
+            if data.get("deck_id") == deck_id and data.get("move_seq", 0) < seq:
+                return  # ainda não é o eco da jogada prevista
+            previsao["chave"] = None  # eco chegou, ou a mão já é outra
+        processar_dados_sala(data)
+
+    def processar_dados_sala(data):
+        """
+        Só mexe em controles e no estado; o que bloqueia (Firestore, page.go)
+        vira tarefa da sessão (recursos.em_segundo_plano).
+        """
 
-            if progression_bars_area:
-                progression_bars_area.atualizar_nomes(oponente.get("nome", "Oponente"))
+        # ---------------------------------------------------------
+        # 1) REDIRECIONAMENTO RÁPIDO PARA PLACAR (se já terminou)
+        # ---------------------------------------------------------
+        if (
+                data.get("game_status") == "finished"
+                and not data.get("player1", {}).get("aguardando_extensao", False)
+                and not data.get("player2", {}).get("aguardando_extensao", False)
+                and data.get("placar_calculado", False)
+        ):
+            print("🏁 Partida encerrada — redirecionando para o placar.")
+            recursos.em_segundo_plano(ir_para_placar)
+            return
 
-            if area_oponente:
-                area_oponente.update_nome_jogador(oponente.get("nome", "Oponente"))
+        # ---------------------------------------------------------
+        # 2) BLOQUEIO LOCAL TEMPORÁRIO (ex: enquanto um diálogo está aberto)
+        # ---------------------------------------------------------
+        if estado_atual().get("bloquear_atualizacoes", False):
+            return
 
-            # Label “Cartas no deck”
-            if nome_local is not None and getattr(nome_local, "current", None):
-                nome_local.current.value = f"🃏 Cartas no deck: {len(deck)}"
-
-            # Área do jogador local
-            if area_jogador_local:
-                area_jogador_local.atualizar_ui(
-                    meu,
-                    is_my_turn,
-                    len(deck),
-                    tentar_jogar_carta,
-                )
-
-            # Área do oponente
-            if area_oponente:
-                area_oponente.atualizar_ui(oponente)
+        jogador_1 = data.get("player1", {}) or {}
+        jogador_2 = data.get("player2", {}) or {}
 
-            # 🔆 Semáforos — baseados SOMENTE no status + limite 50km
-            if area_jogador_local:
-                atualizar_semaforo(area_jogador_local, meu)
-            if area_oponente:
-                atualizar_semaforo(area_oponente, oponente)
-
-            # Barras de progresso
-            if callable(atualizar_barras):
-                atualizar_barras(meu.get("distance", 0), oponente.get("distance", 0))
-
-            # ---------------------------------------------------------
-            # 12) PLACAR FINAL
-            # ---------------------------------------------------------
-            if (
-                    data.get("game_status") == "finished"
-                    and not jogador_1.get("aguardando_extensao", False)
-                    and not jogador_2.get("aguardando_extensao", False)
-            ):
-                if not data.get("placar_calculado", False):
-                    try:
-                        # print("🧮 Calculando placar final...")
-
-                        deck_local = data.get("deck", [])
-                        mao1 = jogador_1.get("hand", []) or []
-                        mao2 = jogador_2.get("hand", []) or []
-                        fim_de_baralho = (not deck_local) and (len(mao1) == 0) and (len(mao2) == 0)
-
-                        if fim_de_baralho:
-                            # 🔥 Caso especial: fim de baralho
-                            finalizar_mao_por_fim_de_baralho(sala_ref)
-                        else:
-                            # 🛣 Caso normal: 700 / 1000 / recusa de extensão
-                            calcular_e_enviar_placar_final(sala_ref, estado_jogo, reescrever_placar=False)
-
-                        sala_ref.update({"placar_calculado": True})
-                        # print("✅ Placar calculado e salvo no Firestore.")
-                        page.go("/placar")
-                        return
-                    except Exception as e:
-                        print(f"⚠️ Erro ao calcular placar final: {e}")
-                        return
-
-                if not estado_jogo.get("ja_exibiu_placar", False):
-                    estado_jogo["ja_exibiu_placar"] = True
-
-                    def delayed():
-                        import time
-                        time.sleep(1)
-                        try:
-                            # print("➡️ Indo para o placar...")
-                            page.go("/placar")
-                        except Exception as e:
-                            print(f"⚠️ Erro ao redirecionar: {e}")
-
-                    import threading
-                    threading.Thread(target=delayed, daemon=True).start()
-
-            # ---------------------------------------------------------
-            # 13) UPDATE FINAL
-            # ---------------------------------------------------------
-            try:
-                page.update()
-            except Exception:
-                pass
+        p1_id = jogador_1.get("id")
+        p2_id = jogador_2.get("id")
+
+        # ---------------------------------------------------------
+        # 3) IDENTIFICAÇÃO DO JOGADOR
+        # ---------------------------------------------------------
+        if jogador_id == p1_id:
+            eh_player1 = True
+        elif jogador_id == p2_id:
+            eh_player1 = False
+        else:
+            # auto-registro se ainda não estiver na sala (condicional:
+            # dois jogadores entrando juntos não pegam a mesma vaga)
+            recursos.em_segundo_plano(atualizar_se, sala_ref, registrar_na_vaga)
+            return
+
+        # ---------------------------------------------------------
+        # 4) ATUALIZAR REFERÊNCIAS DO JOGADOR (CRÍTICO)
+        #    SEMPRE usar o estado mais recente do Firestore; os passos
+        #    4 a 7 montam as mudanças e publicam uma vez só
+        # ---------------------------------------------------------
+        meu = jogador_1 if eh_player1 else jogador_2
+        oponente = jogador_2 if eh_player1 else jogador_1
+        meu_caminho = "player1" if eh_player1 else "player2"
+        turno_atual = data.get("turn", "") or ""
+
+        # ---------------------------------------------------------
+        # 5) FAILSAFE DE TURNO (se algo ficar sem "player1"/"player2")
+        # ---------------------------------------------------------
+        if turno_atual not in ("player1", "player2"):
+            turno_atual = "player1" if p1_id else "player2"
+            recursos.em_segundo_plano(corrigir_turno, turno_atual)
+
+        mudancas = {
+            "eh_player1": eh_player1,
+            "meu": meu,
+            "sala": data,
+            "meu_caminho": meu_caminho,
+            "turno": turno_atual,
+        }
+
+        # ---------------------------------------------------------
+        # 6) STORAGE LOCAL
+        # ---------------------------------------------------------
+        #    (em memória; só valores alterados vão ao navegador)
+        armazenamento.set("meu_caminho", meu_caminho)
+        armazenamento.set("eh_player1", eh_player1)
+
+        # ---------------------------------------------------------
+        # 7) RESET UI QUANDO O DECK É CRIADO
+        # ---------------------------------------------------------
+        if (
+                data.get("game_status") == "started"
+                and "deck_id" in data
+                and not estado_atual().get("resetei_para_nova_mao", False)
+        ):
+            print("🔄 Reset completo da UI para nova mão (gatilho: deck recriado).")
+            mudancas.update(ja_exibiu_dialogo_extensao=False, ja_exibiu_placar=False,
+                            resetei_para_nova_mao=True)
+
+        if data.get("game_status") == "finished":
+            mudancas["resetei_para_nova_mao"] = False
+
+        publicar_estado(**mudancas)
+        escutar_mao(meu_caminho)
+
+        # ---------------------------------------------------------
+        # 8) SE O DECK SUMIU → CRIA NOVO
+        # ---------------------------------------------------------
+        if not cartas_restantes(data) and not data.get("baralho"):
+            print("🔄 Reset completo da UI para nova mão (deck removido ou vazio).")
+            if p1_id and p2_id:
+                recursos.em_segundo_plano(distribuir_cartas_internamente)
+            return
+
+        # ---------------------------------------------------------
+        # 9) EXTENSÃO (mostrar diálogo quando EU estou aguardando)
+        # ---------------------------------------------------------
+        if (
+                meu.get("aguardando_extensao", False)
+                and not estado_atual().get("ja_exibiu_dialogo_extensao", False)
+        ):
+            print("⏳ Extensão pendente — exibindo diálogo.")
+            publicar_estado(ja_exibiu_dialogo_extensao=True)
+            mostrar_extensao_dialogo()
+
+        # ---------------------------------------------------------
+        # 10) CÁLCULO DE is_my_turn
+        #     feito em atualizar_area_local (o listener da mão também usa)
+        # ---------------------------------------------------------
+
+        # ---------------------------------------------------------
+        # 11) ATUALIZAÇÕES DE UI (SEGURO)
+        # ---------------------------------------------------------
+        houve_mudanca = mostrar_sala(data, meu, oponente)
+        cartas_no_deck = estado_atual()["cartas_no_deck"]
+
+        # ---------------------------------------------------------
+        # 12) PLACAR FINAL
+        # ---------------------------------------------------------
+        if (
+                data.get("game_status") == "finished"
+                and not jogador_1.get("aguardando_extensao", False)
+                and not jogador_2.get("aguardando_extensao", False)
+        ):
+            if not data.get("placar_calculado", False):
+                if not reserva_de_placar_ativa(data):
+                    recursos.em_segundo_plano(calcular_placar_e_ir, jogador_1, jogador_2, cartas_no_deck, estado_atual())
+                return
+
+            if not estado_atual().get("ja_exibiu_placar", False):
+                publicar_estado(ja_exibiu_placar=True)
+
+                async def delayed():
+                    await asyncio.sleep(1)
+                    # print("➡️ Indo para o placar...")
+                    await asyncio.to_thread(ir_para_placar)
+
+                recursos.tarefa(delayed)
+
+        # ---------------------------------------------------------
+        # 13) UPDATE FINAL (só se alguma seção mudou; semáforos e
+        #     barras já foram marcados no agendador)
+        # ---------------------------------------------------------
+        if houve_mudanca:
+            render.marcar_pagina()
+
+    # 📥 Snapshots da sala: a central de escutas já atualizou o cache (uma
+    # vez por processo); a UI processa
+    # só o mais novo, no máximo um por quadro (rajadas de escrita não
+    # multiplicam o trabalho).
+    caixa_snapshots = CaixaDeSnapshots(page, processar_sala, recursos)
+
+    def on_snapshot(doc_snapshot, changes, read_time):
+        for doc in doc_snapshot or []:
+            caixa_snapshots.receber(doc)
+
+    # 📡 Uma inscrição por nome na sessão (remontar a view fecha a anterior),
+    # sobre uma única escuta por sala no processo
+    escutas.escutar("sala", sala_ref, on_snapshot)
+
+    # 💤 Aba oculta / app em segundo plano: larga as escutas (nada de
+    # snapshots nem page.update() para um cliente que não está desenhando).
+    # Na volta, reinscrever entrega o estado atual da sala uma vez, e a
+    # caixa_snapshots só o processa se for mais novo que o último visto.
+    def on_ciclo_de_vida(e):
+        if not page.views or page.views[-1] is not view:
+            return  # outra view está na tela; as escutas dela não são nossas
+
+        if e.state in (ft.AppLifecycleState.HIDE, ft.AppLifecycleState.PAUSE):
+            if ciclo["suspensa"]:
+                return
+            ciclo["suspensa"] = True
+            escutas.fechar("sala")
+            escutas.fechar("mao")
+            print("💤 Sessão em segundo plano — escutas suspensas.")
+
+        elif e.state in (ft.AppLifecycleState.SHOW, ft.AppLifecycleState.RESUME):
+            if not ciclo["suspensa"]:
+                return
+            ciclo["suspensa"] = False
+            print("👀 Sessão de volta — retomando escutas.")
+            escutas.escutar("sala", sala_ref, on_snapshot)
+            if estado_atual().get("meu_caminho"):
+                escutar_mao(estado_atual()["meu_caminho"])
 
-    sala_ref.on_snapshot(on_snapshot)
+    page.on_app_lifecycle_state_change = on_ciclo_de_vida
 
     # 1. Cria e armazena o objeto View
     view = ft.View(
@@ -829,8 +1114,7 @@ def jogo_view(page: ft.Page):
 
 
 def calcular_e_enviar_placar_final(sala_ref, estado_jogo, reescrever_placar: bool = False):
-    snapshot = sala_ref.get()
-    sala_data = snapshot.to_dict() or {}
+    sala_data = ler_documento(sala_ref, CAMPOS_PLACAR)
 
     meu_caminho = estado_jogo["meu_caminho"]
     oponente_caminho = "player2" if meu_caminho == "player1" else "player1"
@@ -843,7 +1127,7 @@ def calcular_e_enviar_placar_final(sala_ref, estado_jogo, reescrever_placar: boo
         # print("⚠️ Placar já foi registrado para este jogador. Ignorando duplicata.")
         return
 
-    deck_vazio = not sala_data.get("deck")
+    deck_vazio = not cartas_restantes(sala_data)
 
     # ===============================
     # 🔢 Coleta de dados brutos
@@ -977,7 +1261,7 @@ def calcular_e_enviar_placar_final(sala_ref, estado_jogo, reescrever_placar: boo
     # ==========================================================
     # 🎯 9) Atualiza Firestore
     # ==========================================================
-    sala_ref.update({
+    atualizar_documento(sala_ref, {
         f"{meu_caminho}.placar.atual_mao": placar_meu,
         f"{meu_caminho}.placar.total_geral": total_meu,
         f"{meu_caminho}.placar_registrado": True,
@@ -995,18 +1279,17 @@ def finalizar_mao_por_fim_de_baralho(sala_ref):
     recalculando o placar usando a mesma lógica de 700/1000km,
     mas permitindo reescrever a última mão (caso outro fluxo já tenha gravado algo).
     """
-    snapshot = sala_ref.get()
-    sala_data = snapshot.to_dict() or {}
+    sala_data = ler_documento(sala_ref, CAMPOS_FIM_DE_BARALHO)
 
     player1 = sala_data.get("player1", {}) or {}
     player2 = sala_data.get("player2", {}) or {}
-    deck = sala_data.get("deck", [])
+    restantes = cartas_restantes(sala_data)
 
-    mao1 = player1.get("hand", []) or []
-    mao2 = player2.get("hand", []) or []
+    mao1 = player1.get("hand_count", 0)
+    mao2 = player2.get("hand_count", 0)
 
     # Garante que é fim de baralho + mãos vazias
-    if deck or mao1 or mao2:
+    if restantes or mao1 or mao2:
         return
 
     # print("🛑 Fim de baralho detectado — finalizando mão por falta de cartas.")
@@ -1038,7 +1321,7 @@ def finalizar_mao_por_fim_de_baralho(sala_ref):
         updates["player1.finalizar"] = True
         updates["player2.finalizar"] = True
 
-    sala_ref.update(updates)
+    atualizar_documento(sala_ref, updates)
 
     if vencedor:
         estado_jogo = {"meu_caminho": vencedor}
@@ -8,6 +8,8 @@ import json
 from firebase_admin import credentials, firestore, initialize_app, _apps
 from difflib import SequenceMatcher
 from google.cloud.firestore_v1 import FieldFilter, Transaction
+from firebase_helpers import excluir_sala
+from armazenamento_local import armazenamento_da_pagina
 
 # 🔥 Inicializa Firebase apenas uma vez
 if not _apps:
@@ -70,7 +72,7 @@ def limpar_salas_antigas():
         )
 
         if sala_antiga or nomes_iguais:
-            salas_ref.document(doc.id).delete()
+            excluir_sala(salas_ref.document(doc.id))
             motivo = []
             if sala_antiga:
                 motivo.append("antiga (>5h)")
@@ -169,7 +171,7 @@ def login_view(page: ft.Page):
                             "id": meu_id,
                             "nome": nome_jogador,
                             "oponente": player1_nome,
-                            "hand": [],
+                            "hand_count": 0,
                             "distance": 0,
                             "status": "Luz Vermelha",
                             "limite": False,
@@ -201,7 +203,7 @@ def login_view(page: ft.Page):
                         "id": meu_id,
                         "nome": nome_jogador,
                         "oponente": nome_oponente,
-                        "hand": [],
+                        "hand_count": 0,
                         "distance": 0,
                         "status": "Luz Vermelha",
                         "limite": False,
@@ -214,7 +216,7 @@ def login_view(page: ft.Page):
                         "id": "",
                         "nome": "",
                         "oponente": "",
-                        "hand": [],
+                        "hand_count": 0,
                         "distance": 0,
                         "status": "Luz Vermelha",
                         "limite": False,
@@ -234,11 +236,13 @@ def login_view(page: ft.Page):
                 meu_caminho = "player1"
 
             # 💾 Armazena localmente
-            page.client_storage.set("nome_jogador", nome_jogador)
-            page.client_storage.set("sala_jogador", sala_id)
-            page.client_storage.set("nome_oponente", nome_oponente)
-            page.client_storage.set("meu_caminho", meu_caminho)
-            page.client_storage.set("jogador_id", meu_id)
+            # (na memória da sessão na hora; o navegador recebe em segundo plano)
+            armazenamento = armazenamento_da_pagina(page)
+            armazenamento.set("nome_jogador", nome_jogador)
+            armazenamento.set("sala_jogador", sala_id)
+            armazenamento.set("nome_oponente", nome_oponente)
+            armazenamento.set("meu_caminho", meu_caminho)
+            armazenamento.set("jogador_id", meu_id)
 
             page.go("/jogo")
 
@@ -1,11 +1,13 @@
 import flet as ft
 from firebase_admin import firestore
 import flet_audio as fta
-from firebase_helpers import obter_nome_jogador, resetar_mao  # importar resetar_mao
+from firebase_helpers import obter_nome_jogador, resetar_mao, ler_documento, atualizar_documento, atualizar_sala
 import asyncio
 from anim_manager import AnimationManager
+from armazenamento_local import armazenamento_da_pagina
+from sessao import recursos_da_sessao
 from encerrar_view_atual import encerrar_view_atual  # Assuming this is correctly imported
-from pages.jogo import create_deck, distribuir_cartas
+from pages.jogo import distribuir_cartas
 
 
 def placar_view(page: ft.Page):
@@ -23,18 +25,23 @@ def placar_view(page: ft.Page):
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
     page.vertical_alignment = ft.MainAxisAlignment.CENTER
 
+    recursos = recursos_da_sessao(page)
     anim_manager = AnimationManager()
     audio_vitoria = fta.Audio(src="sounds/victory.mp3", autoplay=False, volume=1.0)
     page.overlay.append(audio_vitoria)
+    # sai do overlay ao trocar de rota (cada placar monta o seu)
+    recursos.registrar("audio", audio_vitoria,
+                       lambda: audio_vitoria in page.overlay and page.overlay.remove(audio_vitoria),
+                       da_view=True)
 
-    nome_jogador = page.client_storage.get("nome_jogador")
-    codigo_sala = page.client_storage.get("sala_jogador")
+    armazenamento = armazenamento_da_pagina(page)
+    nome_jogador = armazenamento.get("nome_jogador")
+    codigo_sala = armazenamento.get("sala_jogador")
 
     # Garantir que jogador está corretamente identificado como player1 ou player2
-    jogador_id = page.client_storage.get("jogador_id")
-    codigo_sala = page.client_storage.get("sala_jogador")
+    jogador_id = armazenamento.get("jogador_id")
     sala_ref = firestore.client().collection("salas").document(codigo_sala)
-    dados = sala_ref.get().to_dict()
+    dados = ler_documento(sala_ref)
 
     if not dados:
         return ft.View(
@@ -240,18 +247,23 @@ def placar_view(page: ft.Page):
             })
 
         # 🔁 Primeiro remove o deck sozinho
-        sala_ref.update({"deck": firestore.DELETE_FIELD})
+        atualizar_documento(sala_ref, {
+            "deck_count": firestore.DELETE_FIELD,
+            "deck_id": firestore.DELETE_FIELD,
+        })
 
         # 🔁 Gatilhos de nova mão
-        updates["deck"] = firestore.DELETE_FIELD  # força o jogo.py a criar novo baralho e redistribuir
+        updates["deck_count"] = firestore.DELETE_FIELD  # força o jogo.py a criar novo baralho e redistribuir
+        updates["deck_id"] = firestore.DELETE_FIELD
         updates["game_status"] = "started"  # <-- o jogo.py procura exatamente isso
         updates["turn"] = "player1"
         updates["placar_calculado"] = False  # garante que a próxima mão volte a calcular normalmente
+        updates["placar_calculando"] = firestore.DELETE_FIELD
         updates["extensao_ativa"] = False
         updates["baralho"] = False
 
         # print("atualiza firestore")
-        sala_ref.update(updates)
+        atualizar_sala(sala_ref, updates)
 
     async def voltar_jogo(e):
         try:
@@ -464,7 +476,7 @@ def placar_view(page: ft.Page):
                         await iniciar_animacao_vencedor()
                         return
 
-            page.run_task(iniciar_animacoes_seguras)
+            recursos.tarefa(iniciar_animacoes_seguras)
 
     view = ft.View(
         route="/placar",
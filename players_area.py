@@ -1,6 +1,32 @@
 # players_area.py
+from functools import partial
+
 import flet as ft
 
+from agendador_render import agendador_da_pagina
+
+
+# 🎨 Ícone e estilo de botão por tipo de carta — montados uma vez e
+# compartilhados por todos os botões da mão.
+def _estilo_carta(cor):
+    return ft.ButtonStyle(
+        color=cor,
+        padding=ft.Padding(8, 4, 8, 4),
+        shape=ft.RoundedRectangleBorder(radius=6),
+        bgcolor=ft.Colors.WHITE,
+        side=ft.BorderSide(2, cor)
+    )
+
+
+ESTILOS_CARTA = {
+    "ataque": ("⚠️", _estilo_carta(ft.Colors.RED)),
+    "defesa": ("🛡️", _estilo_carta(ft.Colors.GREEN)),
+    "segurança": ("⭐", _estilo_carta(ft.Colors.ORANGE)),
+    "distancia": ("🚗", _estilo_carta(ft.Colors.BLUE)),
+}
+ESTILO_CARTA_DESCONHECIDA = ("❓", _estilo_carta(ft.Colors.BLACK))
+
+
 # A classe agora herda diretamente de ft.Column, evitando o erro do UserControl.
 class AreaDeJogoDoJogador(ft.Column):
     def __init__(self, nome_jogador: str, eh_local: bool):
@@ -23,6 +49,10 @@ class AreaDeJogoDoJogador(ft.Column):
 
         if self.eh_local:
             self.hand_column = ft.Ref[ft.Row]()
+            # Botões da mão por chave (tipo, valor, n-ésima cópia): reaproveitados entre snapshots
+            self._botoes_mao = {}
+            self._vez = False
+            self._jogar_carta = None
 
         # 3. Define a lista de controles da Coluna
         self.controls = [
@@ -175,13 +205,13 @@ class AreaDeJogoDoJogador(ft.Column):
         nome_text_control: ft.Text = self.controls[0].controls[0]
         nome_text_control.value = novo_nome
 
-        # O self.update() força a atualização do controle (se estiver montado na página)
+        # Marca o controle para o próximo quadro (se estiver montado na página)
         if self.page:
-            self.update()
+            agendador_da_pagina(self.page).marcar(self)
 
     # O método atualizar_ui permanece
     def atualizar_ui(self, jogador_data: dict, is_my_turn: bool = False, deck_size: int = 0,
-                     tentar_jogar_carta_callback=None):
+                     tentar_jogar_carta_callback=None, jogadas=None):
         # --- UI Comum ---
         self.distance_txt.current.value = f'{jogador_data.get("distance", 0)} Km'
         self.distance_txt.current.color = ft.Colors.BLUE if jogador_data.get("distance", 0) > 0 else ft.Colors.GREY_500
@@ -217,32 +247,62 @@ class AreaDeJogoDoJogador(ft.Column):
             self.turno_info.current.value = "✅ Sua vez!" if is_my_turn else "⏳ Aguardando o outro jogador..."
 
             # 🃏 Mão do jogador
-            self.hand_column.current.controls.clear()
-            for carta_item in jogador_data.get("hand", []):
-                tipo = carta_item.get("type")
-                icone = "❓"
-                cor = ft.Colors.BLACK
-                if tipo == "ataque":
-                    icone, cor = "⚠️", ft.Colors.RED
-                elif tipo == "defesa":
-                    icone, cor = "🛡️", ft.Colors.GREEN
-                elif tipo == "segurança":
-                    icone, cor = "⭐", ft.Colors.ORANGE
-                elif tipo == "distancia":
-                    icone, cor = "🚗", ft.Colors.BLUE
-
-                self.hand_column.current.controls.append(
-                    ft.ElevatedButton(
-                        text=f"{icone} {carta_item['value']}",
-                        on_click=(lambda e, c=carta_item: tentar_jogar_carta_callback(c)) if is_my_turn else None,
-                        opacity=1.0 if is_my_turn else 0.5,
-                        disabled=not is_my_turn,
-                        style=ft.ButtonStyle(
-                            color=cor,
-                            padding=ft.Padding(8, 4, 8, 4),
-                            shape=ft.RoundedRectangleBorder(radius=6),
-                            bgcolor=ft.Colors.WHITE,
-                            side=ft.BorderSide(2, cor)
-                        )
-                    )
-                )
\ No newline at end of file
+            self._reconciliar_mao(jogador_data.get("hand", []), is_my_turn, tentar_jogar_carta_callback,
+                                  jogadas or {})
+
+    def _reconciliar_mao(self, mao, is_my_turn, tentar_jogar_carta_callback, jogadas):
+        """
+        Mantém um botão por carta (chave = tipo, valor, n-ésima cópia): cartas que
+        continuam na mão reaproveitam o botão e só mudam disabled/opacity/tooltip.
+
+        jogadas: {(tipo, valor): True ou motivo}. Na minha vez, carta que só
+        serve para descarte fica clicável (abre o descarte), mas esmaecida e
+        com o motivo no tooltip.
+        """
+        self._vez = is_my_turn
+        self._jogar_carta = tentar_jogar_carta_callback
+
+        copias = {}
+        chaves = []
+        for carta_item in mao:
+            base = (carta_item.get("type"), carta_item["value"])
+            chave = (*base, copias.get(base, 0))
+            copias[base] = chave[2] + 1
+            chaves.append(chave)
+
+            botao = self._botoes_mao.get(chave)
+            if botao is None:
+                botao = self._botoes_mao[chave] = self._criar_botao_carta(carta_item)
+            motivo = jogadas.get(base, True)
+            if not is_my_turn:
+                aparencia = (True, 0.5, None)
+            elif motivo is True:
+                aparencia = (False, 1.0, None)
+            else:
+                aparencia = (False, 0.7, f"Só descarte: {motivo}")
+            if (botao.disabled, botao.opacity, botao.tooltip) != aparencia:
+                botao.disabled, botao.opacity, botao.tooltip = aparencia
+
+        # Botões de cartas que saíram da mão
+        for chave in set(self._botoes_mao) - set(chaves):
+            del self._botoes_mao[chave]
+
+        botoes = [self._botoes_mao[chave] for chave in chaves]
+        controles = self.hand_column.current.controls
+        if len(botoes) != len(controles) or any(a is not b for a, b in zip(botoes, controles)):
+            controles[:] = botoes
+
+    def _criar_botao_carta(self, carta_item):
+        icone, estilo = ESTILOS_CARTA.get(carta_item.get("type"), ESTILO_CARTA_DESCONHECIDA)
+        return ft.ElevatedButton(
+            text=f"{icone} {carta_item['value']}",
+            on_click=partial(self._clicar_carta, carta_item),
+            opacity=0.5,
+            disabled=True,
+            style=estilo
+        )
+
+    async def _clicar_carta(self, carta_item, e=None):
+        # handler async: a jogada aguarda o ator no loop, sem prender thread
+        if self._vez and self._jogar_carta:
+            await self._jogar_carta(carta_item)
@@ -0,0 +1,219 @@
+import threading
+
+import flet as ft
+
+from firebase_helpers import registrar_snapshot, escuta_aberta, escuta_fechada
+from sessao import da_sessao, recursos_da_sessao
+
+
+# ---------------------------------------------------
+# 📡 Central de escutas do processo
+# ---------------------------------------------------
+# Uma única escuta do Firestore por documento (sala ou mão), não importa
+# quantas sessões deste servidor estejam olhando para ele. Cada snapshot
+# é decodificado uma vez, registrado no cache uma vez e repassado a todas
+# as sessões inscritas. A escuta fecha quando a última sessão sai, e com
+# ela a entrada do documento no cache de firebase_helpers.
+class SnapshotDecodificado:
+    """
+    Snapshot já decodificado, compartilhado entre as sessões: to_dict()
+    devolve sempre o mesmo dict — quem recebe só lê, não altera.
+    """
+
+    def __init__(self, doc):
+        self.reference = doc.reference
+        self.id = doc.id
+        self.exists = doc.exists
+        self.update_time = doc.update_time
+        self._data = doc.to_dict() if doc.exists else None
+
+    def to_dict(self):
+        return self._data
+
+
+class _EscutaCompartilhada:
+    def __init__(self, ref):
+        self.ref = ref
+        self.inscritos = {}
+        self.ultimo = None
+        self.watch = None
+
+
+class CentralDeEscutas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._escutas = {}
+        self._proximo_id = 0
+
+    def assinar(self, ref, callback):
+        """
+        Inscreve callback(docs, changes, read_time) no documento; abre a
+        escuta se for o primeiro inscrito. Devolve um objeto com
+        unsubscribe(), como o watch do Firestore.
+        """
+        with self._lock:
+            escuta = self._escutas.get(ref.path)
+            nova = escuta is None
+            if nova:
+                escuta = self._escutas[ref.path] = _EscutaCompartilhada(ref)
+                escuta_aberta(ref)
+            self._proximo_id += 1
+            chave = self._proximo_id
+            escuta.inscritos[chave] = callback
+            ultimo = escuta.ultimo
+
+        if nova:
+            try:
+                escuta.watch = ref.on_snapshot(lambda docs, changes, read_time:
+                                               self._repassar(escuta, docs, changes, read_time))
+            except Exception:
+                with self._lock:
+                    if self._escutas.get(ref.path) is escuta:
+                        del self._escutas[ref.path]
+                        escuta_fechada(ref)
+                raise
+            with self._lock:
+                aberta = self._escutas.get(ref.path) is escuta
+            if not aberta:
+                # todos saíram enquanto a escuta abria
+                escuta.watch.unsubscribe()
+        elif ultimo is not None:
+            # quem chega depois recebe já o estado atual (como faria o Firestore)
+            callback([ultimo], [], None)
+
+        return _Assinatura(self, escuta, chave)
+
+    def _repassar(self, escuta, docs, changes, read_time):
+        decodificados = []
+        for doc in docs or []:
+            snapshot = SnapshotDecodificado(doc)
+            registrar_snapshot(snapshot)
+            decodificados.append(snapshot)
+
+        with self._lock:
+            if decodificados:
+                escuta.ultimo = decodificados[-1]
+            inscritos = list(escuta.inscritos.values())
+
+        for callback in inscritos:
+            try:
+                callback(decodificados, changes, read_time)
+            except Exception as e:
+                print(f"⚠️ Erro num inscrito de {escuta.ref.path}: {e}")
+
+    def _sair(self, escuta, chave):
+        with self._lock:
+            escuta.inscritos.pop(chave, None)
+            if escuta.inscritos or self._escutas.get(escuta.ref.path) is not escuta:
+                return
+            del self._escutas[escuta.ref.path]
+            escuta_fechada(escuta.ref)
+        if escuta.watch is not None:
+            try:
+                escuta.watch.unsubscribe()
+            except Exception as e:
+                print(f"⚠️ Erro ao fechar a escuta de {escuta.ref.path}: {e}")
+
+    def escutas_ativas(self) -> int:
+        with self._lock:
+            return len(self._escutas)
+
+    def assinaturas_ativas(self) -> int:
+        with self._lock:
+            return sum(len(escuta.inscritos) for escuta in self._escutas.values())
+
+
+class _Assinatura:
+    def __init__(self, central, escuta, chave):
+        self._central = central
+        self._escuta = escuta
+        self._chave = chave
+
+    def unsubscribe(self):
+        self._central._sair(self._escuta, self._chave)
+
+
+central_de_escutas = CentralDeEscutas()
+
+
+def escutas_ativas() -> int:
+    """Quantas escutas do Firestore estão abertas neste processo."""
+    return central_de_escutas.escutas_ativas()
+
+
+def assinaturas_ativas() -> int:
+    """Quantas inscrições de sessões existem sobre essas escutas."""
+    return central_de_escutas.assinaturas_ativas()
+
+
+# ---------------------------------------------------
+# 🗂️ Escutas de uma sessão
+# ---------------------------------------------------
+class RegistroDeEscutas:
+    """
+    Escutas da sessão, por nome ("sala", "mao" ...). Abrir uma escuta com
+    um nome que já existe fecha a anterior primeiro, então remontar a view
+    (cada page.go("/jogo") roda o jogo_view de novo) não acumula inscrições.
+    O main fecha todas a cada troca de rota; cada inscrição também fica
+    nos recursos da sessão, que a fecham se o navegador desconectar.
+    """
+
+    def __init__(self, recursos=None):
+        self._lock = threading.Lock()
+        self._escutas = {}
+        self._recursos = recursos
+
+    def escutar(self, nome, ref, callback):
+        self.fechar(nome)
+        assinatura = central_de_escutas.assinar(ref, callback)
+        with self._lock:
+            anterior = self._escutas.pop(nome, None)
+            self._escutas[nome] = assinatura
+        if self._recursos is not None:
+            self._recursos.registrar("escuta", assinatura,
+                                     lambda: self._fechar_se(nome, assinatura))
+        if anterior is not None:
+            # duas aberturas concorrentes com o mesmo nome: fica a mais nova
+            self._encerrar(nome, anterior)
+        return assinatura
+
+    def _fechar_se(self, nome, assinatura):
+        with self._lock:
+            if self._escutas.get(nome) is assinatura:
+                del self._escutas[nome]
+        self._encerrar(nome, assinatura)
+
+    def fechar(self, nome):
+        with self._lock:
+            assinatura = self._escutas.pop(nome, None)
+        if assinatura is not None:
+            self._encerrar(nome, assinatura)
+
+    def fechar_todas(self):
+        with self._lock:
+            escutas = list(self._escutas.items())
+            self._escutas.clear()
+        for nome, assinatura in escutas:
+            self._encerrar(nome, assinatura)
+
+    def ativa(self, nome) -> bool:
+        with self._lock:
+            return nome in self._escutas
+
+    def __len__(self):
+        with self._lock:
+            return len(self._escutas)
+
+    def _encerrar(self, nome, assinatura):
+        if self._recursos is not None:
+            self._recursos.liberar(assinatura)
+        try:
+            assinatura.unsubscribe()
+        except Exception as e:
+            print(f"⚠️ Erro ao fechar a escuta '{nome}': {e}")
+
+
+def registro_da_pagina(page: ft.Page) -> RegistroDeEscutas:
+    """Registro de escutas da sessão (um por page, guardado em page.session)."""
+    return da_sessao(page, "registro_escutas",
+                     lambda page: RegistroDeEscutas(recursos_da_sessao(page)))
@@ -0,0 +1,265 @@
+from dataclasses import dataclass, fields, replace
+
+from deck import KM_CARTA
+
+# ---------------------------------------------------
+# 🏁 Regras do Mille Bornes, sem Firestore e sem efeitos colaterais
+# ---------------------------------------------------
+# aplicar(estado, jogador, carta) valida e aplica uma carta sobre um estado
+# compacto e imutável (EstadoMao) e devolve (novo_estado, Jogada) ou
+# (estado, motivo). Quem fala com o Firestore (firebase_helpers) só converte
+# a sala para EstadoMao e a Jogada de volta para updates.
+EXTENSAO_PENDENTE = "EXTENSAO_PENDENTE"
+
+# Ataque → segurança que protege contra ele
+SEGURANCA_CONTRA = {
+    "Luz Vermelha": "Caminho Livre",
+    "Limite 50 km": "Caminho Livre",
+    "Acidente": "Bom Motorista",
+    "Pneu Furado": "Pneu de Aço",
+    "Sem Gasolina": "Tanque Extra",
+}
+
+# Defesa → status que ela conserta (Fim de Limite é tratado à parte)
+STATUS_CONSERTADO = {
+    "Luz Verde": "Luz Vermelha",
+    "Conserto": "Acidente",
+    "Estepe": "Pneu Furado",
+    "Gasolina": "Sem Gasolina",
+}
+
+# Segurança → status que ela resolve como resposta (além de proteger)
+STATUS_RESOLVIDO = {
+    "Caminho Livre": "Luz Vermelha",
+    "Bom Motorista": "Acidente",
+    "Pneu de Aço": "Pneu Furado",
+    "Tanque Extra": "Sem Gasolina",
+}
+
+
+@dataclass(frozen=True)
+class EstadoJogador:
+    distancia: int = 0
+    status: str = ""
+    limite: bool = False
+    segurancas: tuple = ()
+    respostas_seguranca: int = 0
+    com_200: str = "N"
+    extensao: bool = False
+    aguardando_extensao: bool = False
+    vencedor: bool = False
+    finalizar: bool = False
+
+
+@dataclass(frozen=True)
+class EstadoMao:
+    player1: EstadoJogador
+    player2: EstadoJogador
+    turno: str = "player1"
+    status_jogo: str = "started"
+
+    def jogador(self, caminho) -> EstadoJogador:
+        return getattr(self, caminho)
+
+
+@dataclass(frozen=True)
+class Jogada:
+    resultado: object  # True ou EXTENSAO_PENDENTE
+    campos: dict       # updates da sala (caminhos com ponto), sem a mão
+
+
+# Campo do EstadoJogador → campo do jogador no documento da sala
+CAMPOS_SALA = {
+    "distancia": "distance",
+    "status": "status",
+    "limite": "limite",
+    "segurancas": "safeties",
+    "respostas_seguranca": "safety_responses",
+    "com_200": "com_200",
+    "extensao": "extensao",
+    "aguardando_extensao": "aguardando_extensao",
+    "vencedor": "winner",
+    "finalizar": "finalizar",
+}
+
+
+def oponente_de(caminho):
+    return "player2" if caminho == "player1" else "player1"
+
+
+def jogador_da_sala(dados: dict) -> EstadoJogador:
+    dados = dados or {}
+    padrao = EstadoJogador()
+    valores = {
+        campo: dados.get(campo_sala, getattr(padrao, campo))
+        for campo, campo_sala in CAMPOS_SALA.items()
+    }
+    valores["segurancas"] = tuple(valores["segurancas"] or ())
+    return EstadoJogador(**valores)
+
+
+def estado_da_sala(sala_data: dict, turno=None) -> EstadoMao:
+    """EstadoMao a partir do documento da sala (turno: o da sala, senão o informado)."""
+    turno = sala_data.get("turn") or turno
+    if turno not in ("player1", "player2"):
+        turno = "player1"  # fallback defensivo
+    return EstadoMao(
+        player1=jogador_da_sala(sala_data.get("player1")),
+        player2=jogador_da_sala(sala_data.get("player2")),
+        turno=turno,
+        status_jogo=sala_data.get("game_status") or "started",
+    )
+
+
+def campos_alterados(antes: EstadoMao, depois: EstadoMao) -> dict:
+    """Diferença entre dois estados como updates da sala."""
+    campos = {}
+    for caminho in ("player1", "player2"):
+        jogador_antes, jogador_depois = antes.jogador(caminho), depois.jogador(caminho)
+        for campo in fields(EstadoJogador):
+            valor = getattr(jogador_depois, campo.name)
+            if valor != getattr(jogador_antes, campo.name):
+                campos[f"{caminho}.{CAMPOS_SALA[campo.name]}"] = (
+                    list(valor) if isinstance(valor, tuple) else valor
+                )
+    if depois.turno != antes.turno:
+        campos["turn"] = depois.turno
+    if depois.status_jogo != antes.status_jogo:
+        campos["game_status"] = depois.status_jogo
+    return campos
+
+
+def aplicar(estado: EstadoMao, caminho: str, carta: dict):
+    """
+    Aplica a carta jogada por caminho ("player1"/"player2").
+
+    Retorna (novo_estado, Jogada) quando a jogada vale, ou (estado, motivo)
+    com o motivo da recusa (texto mostrado ao jogador). Só quem tem a vez joga.
+    """
+    if caminho != estado.turno:
+        return estado, "não é a sua vez"
+
+    regra = _REGRAS.get(carta["type"])
+    if regra is None:
+        return estado, "tipo de carta desconhecido"
+
+    meu = estado.jogador(caminho)
+    oponente = oponente_de(caminho)
+    resultado = regra(meu, estado.jogador(oponente), carta["value"],
+                      estado.player1.extensao or estado.player2.extensao)
+    if isinstance(resultado, str):
+        return estado, resultado
+
+    novo_meu, novo_oponente, pendente = resultado
+    novo = replace(estado, **{caminho: novo_meu, oponente: novo_oponente})
+
+    if pendente:
+        # ⚠️ NÃO passa o turno — o mesmo jogador decide a extensão
+        jogada = Jogada(EXTENSAO_PENDENTE, {})
+    else:
+        if novo_meu.distancia == 1000:
+            novo = replace(novo, status_jogo="finished")
+        novo = replace(novo, turno=oponente)
+        jogada = Jogada(True, {})
+
+    return novo, replace(jogada, campos=campos_alterados(estado, novo))
+
+
+# Cada regra recebe (meu, oponente, valor, limite_700_removido) e devolve
+# (novo_meu, novo_oponente, extensao_pendente) ou o motivo da recusa.
+def _distancia(meu, oponente, valor, limite_700_removido):
+    if meu.aguardando_extensao:
+        return "você precisa escolher entre extensão ou descarte"
+    if meu.status != "Luz Verde":
+        return "você não está com 'Luz Verde'"
+
+    km = KM_CARTA[valor]
+    # Limite de 50 km vem ANTES de somar a distância
+    if meu.limite and km > 50:
+        return "o limite de 50 km está Ativo"
+
+    nova_distancia = meu.distancia + km
+    com_200 = "S" if km == 200 else meu.com_200
+
+    # Exatamente 700 km sem extensão → jogador decide se estende
+    if not limite_700_removido and nova_distancia == 700:
+        return replace(meu, distancia=nova_distancia, com_200=com_200,
+                       aguardando_extensao=True), oponente, True
+    if not limite_700_removido and nova_distancia > 700:
+        return "você precisa de exatos 700 km para pedir extensão ou encerrar a partida"
+    if nova_distancia > 1000:
+        return "você precisa de exatos 1000 km para encerrar a partida"
+
+    novo_meu = replace(meu, distancia=nova_distancia, com_200=com_200)
+    if nova_distancia == 1000:
+        novo_meu = replace(novo_meu, vencedor=True, finalizar=True)
+    return novo_meu, oponente, False
+
+
+def _ataque(meu, oponente, valor, limite_700_removido):
+    seguranca = SEGURANCA_CONTRA.get(valor)
+    if seguranca and seguranca in oponente.segurancas:
+        return f"o oponente está protegido pela segurança '{seguranca}'"
+
+    if valor == "Limite 50 km":
+        if oponente.limite:
+            return "o oponente já está com o Limite 50 km Ativo"
+        return meu, replace(oponente, limite=True), False
+
+    if oponente.status != "Luz Verde":
+        return "o oponente não está com 'Luz Verde'"
+    return meu, replace(oponente, status=valor), False
+
+
+def _defesa(meu, oponente, valor, limite_700_removido):
+    if valor == "Fim de Limite":
+        if not meu.limite:
+            return "você não está com o Limite 50 km Ativo"
+        return replace(meu, limite=False), oponente, False
+
+    if valor not in STATUS_CONSERTADO:
+        return "não foi possível determinar a regra de defesa"
+    if meu.status != STATUS_CONSERTADO[valor]:
+        return f"você está com '{meu.status}' e não com '{STATUS_CONSERTADO[valor]}'"
+    return replace(meu, status="Luz Verde"), oponente, False
+
+
+def _seguranca(meu, oponente, valor, limite_700_removido):
+    if valor in meu.segurancas:
+        return "você já tem essa carta de segurança em jogo"
+
+    novo_meu = replace(meu, segurancas=meu.segurancas + (valor,))
+
+    if valor == "Caminho Livre":
+        # protege contra Luz Vermelha e Limite 50 km; conta como resposta sempre
+        novo_meu = replace(novo_meu, limite=False,
+                           respostas_seguranca=meu.respostas_seguranca + 1)
+        if meu.status == "Luz Vermelha":
+            novo_meu = replace(novo_meu, status="Luz Verde")
+    elif meu.status == STATUS_RESOLVIDO.get(valor):
+        novo_meu = replace(novo_meu, status="Luz Verde",
+                           respostas_seguranca=meu.respostas_seguranca + 1)
+
+    return novo_meu, oponente, False
+
+
+_REGRAS = {
+    "distancia": _distancia,
+    "ataque": _ataque,
+    "defesa": _defesa,
+    "segurança": _seguranca,
+}
+
+
+def avaliar_mao(estado: EstadoMao, caminho: str, mao) -> dict:
+    """
+    {(tipo, valor): True ou motivo} para cada carta distinta da mão: o que
+    pode ser jogado agora e o que só serve para descarte (e por quê).
+    """
+    avaliacao = {}
+    for carta in mao:
+        chave = (carta["type"], carta["value"])
+        if chave not in avaliacao:
+            _, jogada = aplicar(estado, caminho, carta)
+            avaliacao[chave] = True if isinstance(jogada, Jogada) else jogada
+    return avaliacao
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+
+import flet as ft
+
+# reentrante: a criação de um objeto da sessão pode pedir outro
+# (ex.: o registro de escutas pede os recursos da sessão)
+_criacao_lock = threading.RLock()
+
+# 🧾 Sessões conectadas neste processo (session_id → RecursosDaSessao)
+_sessoes = {}
+_sessoes_lock = threading.Lock()
+
+
+def sessoes_ativas() -> int:
+    """Quantas sessões estão conectadas neste processo."""
+    with _sessoes_lock:
+        return len(_sessoes)
+
+
+def recursos_ativos() -> dict:
+    """Recursos vivos somando todas as sessões, por tipo (escuta, tarefa, audio...)."""
+    with _sessoes_lock:
+        sessoes = list(_sessoes.values())
+    total = {}
+    for sessao in sessoes:
+        for tipo, n in sessao.contagem().items():
+            total[tipo] = total.get(tipo, 0) + n
+    return total
+
+
+class RecursosDaSessao:
+    """
+    Tudo o que as views de uma sessão abrem e que precisa ser fechado
+    quando o navegador some: escutas do Firestore, tarefas no loop,
+    áudios no overlay.
+
+    registrar(tipo, recurso, encerrar) guarda o recurso com a função que o
+    fecha; liberar(recurso) tira da lista quando ele terminou sozinho. Com
+    da_view=True o recurso pertence só à view atual e é encerrado também na
+    troca de rota (encerrar_view).
+    No page.on_disconnect / page.on_close tudo é encerrado de uma vez; se
+    o cliente reconectar, a view atual é remontada (e reabre o que precisa).
+    Inclui o flush do agendador de render, a caixa de snapshots e a
+    gravação do armazenamento local, que rodam como tarefas da sessão.
+    """
+
+    def __init__(self, page: ft.Page):
+        self.page = page
+        self._lock = threading.Lock()
+        self._recursos = {}
+        self._da_view = set()
+
+    def registrar(self, tipo, recurso, encerrar=None, da_view=False):
+        with self._lock:
+            self._recursos[id(recurso)] = (tipo, recurso, encerrar)
+            if da_view:
+                self._da_view.add(id(recurso))
+        return recurso
+
+    def liberar(self, recurso):
+        with self._lock:
+            self._recursos.pop(id(recurso), None)
+            self._da_view.discard(id(recurso))
+
+    def encerrar_view(self):
+        """Troca de rota: encerra os recursos registrados com da_view=True."""
+        with self._lock:
+            recursos = [self._recursos.pop(chave) for chave in self._da_view if chave in self._recursos]
+            self._da_view.clear()
+        self._encerrar_todos(recursos)
+
+    def tarefa(self, handler, *args):
+        """page.run_task registrado: cancelado no fim da sessão."""
+        tarefa = self.page.run_task(handler, *args)
+        self.registrar("tarefa", tarefa, tarefa.cancel)
+        tarefa.add_done_callback(self.liberar)
+        return tarefa
+
+    def em_segundo_plano(self, funcao, *args):
+        """
+        Chamada bloqueante (Firestore, page.go) como tarefa da sessão: a
+        tarefa aguarda a chamada no executor compartilhado do loop, sem
+        thread própria, e é cancelada com a sessão.
+        """
+        async def executar():
+            try:
+                await asyncio.to_thread(funcao, *args)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Erro em {getattr(funcao, '__name__', funcao)}: {e}")
+
+        return self.tarefa(executar)
+
+    def contagem(self) -> dict:
+        with self._lock:
+            tipos = [tipo for tipo, _, _ in self._recursos.values()]
+        return {tipo: tipos.count(tipo) for tipo in set(tipos)}
+
+    def encerrar(self):
+        with self._lock:
+            recursos = list(self._recursos.values())
+            self._recursos.clear()
+            self._da_view.clear()
+        with _sessoes_lock:
+            _sessoes.pop(self.page.session_id, None)
+
+        self._encerrar_todos(recursos)
+        print(f"🧹 Sessão encerrada: {len(recursos)} recurso(s) liberado(s), {sessoes_ativas()} sessão(ões) ativa(s).")
+
+    @staticmethod
+    def _encerrar_todos(recursos):
+        for tipo, recurso, encerrar in recursos:
+            if encerrar is None:
+                continue
+            try:
+                encerrar()
+            except Exception as e:
+                print(f"⚠️ Erro ao encerrar {tipo}: {e}")
+
+    def _conectar(self):
+        with _sessoes_lock:
+            _sessoes[self.page.session_id] = self
+
+    def _reconectar(self):
+        self._conectar()
+        try:
+            self.page.go(self.page.route)
+        except Exception as e:
+            print(f"⚠️ Erro ao remontar a view após reconexão: {e}")
+
+
+def da_sessao(page: ft.Page, chave, criar):
+    """
+    Objeto único da sessão guardado em page.session[chave]; criar(page) só
+    roda na primeira vez. Base das fábricas xxx_da_pagina / _da_sessao.
+    """
+    with _criacao_lock:
+        objeto = page.session.get(chave)
+        if objeto is None:
+            objeto = criar(page)
+            page.session.set(chave, objeto)
+        return objeto
+
+
+def _nova_sessao(page: ft.Page) -> RecursosDaSessao:
+    recursos = RecursosDaSessao(page)
+    recursos._conectar()
+    page.on_disconnect = lambda e: recursos.encerrar()
+    page.on_close = lambda e: recursos.encerrar()
+    page.on_connect = lambda e: recursos._reconectar()
+    return recursos
+
+
+def recursos_da_sessao(page: ft.Page) -> RecursosDaSessao:
+    """Recursos da sessão (um por page, guardado em page.session)."""
+    return da_sessao(page, "recursos_sessao", _nova_sessao)